@@ -0,0 +1,259 @@
+"""
+Process-wide admission control for optional, expensive work (export builds,
+researcher aggregations).
+
+Jobs go into one priority queue and are started by a fixed set of worker
+threads, each start paid for from a token bucket (``ADMISSION_RATE`` tokens
+per second, bursts of up to ``ADMISSION_BURST``). A class submitting at once
+therefore queues up instead of building every export at the same moment; the
+durable log write never goes through here. When the queue is full the
+lowest-priority queued job is shed (its ticket fails with ``Overloaded``).
+Researcher jobs are deferred: one starts only while no participant job is
+queued or running, so a researcher export never takes a worker from them.
+
+Jobs submitted with a ``key`` are deduplicated: while a ticket for that key
+is queued, running or among the last ``RESULT_CACHE_SIZE`` keyed ones (and
+the finished ones' results fit in ``RESULT_CACHE_BYTES``), the same ticket
+is returned (e.g. one researcher export per log version). A finished ticket
+drops its function and arguments, so a cached result does not keep e.g. an
+evicted study alive.
+Jobs with the same ``coalesce`` value share one ticket while it has not
+started yet: an all-sessions export reads the log when it starts, so one
+queued build serves everyone who asked for it in the meantime. A shared
+ticket still queued is raised to the most urgent priority requested.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+ADMISSION_WORKERS = int(os.environ.get("EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+ADMISSION_RATE = float(os.environ.get("ADMISSION_RATE", "4"))
+ADMISSION_BURST = float(os.environ.get("ADMISSION_BURST", "8"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "200"))
+RESULT_CACHE_SIZE = 8
+RESULT_CACHE_BYTES = int(os.environ.get("ADMISSION_RESULT_CACHE_BYTES", str(64 * 1024 * 1024)))
+WAIT_SAMPLES = 500
+
+# Lower runs first.
+PRIORITY_SESSION = 0  # a participant's own summary (Word / PDF)
+PRIORITY_BULK = 1  # all-sessions export offered to participants after submit
+PRIORITY_RESEARCHER = 2  # researcher downloads / aggregations (deferred)
+
+
+class Overloaded(RuntimeError):
+    """The job was shed because the admission queue was full."""
+
+
+class Ticket:
+    """A queued job: its Future plus the timestamps needed to report waiting."""
+
+    __slots__ = ("priority", "seq", "cost", "coalesce", "fn", "args", "future", "submitted_at", "started_at", "finished_at")
+
+    def __init__(self, priority: int, seq: int, cost: float, coalesce, fn, args):
+        self.priority = priority
+        self.seq = seq
+        self.cost = cost
+        self.coalesce = coalesce
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+
+    def __lt__(self, other: "Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self):
+        return self.future.result()
+
+    @property
+    def queue_wait(self) -> float:
+        """Seconds spent queued (so far, if not started yet)."""
+        return (self.started_at or time.monotonic()) - self.submitted_at
+
+
+def _result_bytes(ticket: Ticket) -> int:
+    """Size of a finished ticket's bytes result (0 otherwise)."""
+    if not ticket.done() or ticket.future.cancelled() or ticket.future.exception() is not None:
+        return 0
+    result = ticket.future.result()
+    return len(result) if isinstance(result, (bytes, bytearray)) else 0
+
+
+class AdmissionController:
+    """Token bucket + priority queue in front of a small pool of worker threads."""
+
+    def __init__(
+        self,
+        workers: int = ADMISSION_WORKERS,
+        rate: float = ADMISSION_RATE,
+        burst: float = ADMISSION_BURST,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+    ):
+        if rate <= 0:
+            raise ValueError(f"admission rate must be positive, got {rate}")
+        if burst < 1:
+            raise ValueError(f"admission burst must be at least 1, got {burst}")
+        self.workers = max(1, workers)
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self._queue = []
+        self._seq = itertools.count()
+        self._by_key = OrderedDict()
+        self._queued_by_coalesce = {}
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._running = 0
+        self._running_participant = 0
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"admission-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(
+        self, fn, *args, priority: int = PRIORITY_BULK, cost: float = 1.0, key=None, coalesce=None
+    ) -> Ticket:
+        """Queue ``fn(*args)``; returns its Ticket (an existing one for a known ``key`` / ``coalesce``)."""
+        with self._cond:
+            ticket = None
+            if key is not None:
+                existing = self._by_key.get(key)
+                if existing is not None and not (existing.done() and existing.future.exception() is not None):
+                    self._by_key.move_to_end(key)
+                    self._promote(existing, priority)
+                    return existing
+            if coalesce is not None:
+                ticket = self._queued_by_coalesce.get(coalesce)
+                if ticket is not None:
+                    self._promote(ticket, priority)
+            if ticket is None:
+                ticket = Ticket(priority, next(self._seq), min(cost, self.burst), coalesce, fn, args)
+                if len(self._queue) >= self.max_queue:
+                    victim = max(self._queue)
+                    if not ticket < victim:
+                        self._shed(ticket)
+                        return ticket
+                    self._queue.remove(victim)
+                    heapq.heapify(self._queue)
+                    self._shed(victim)
+                heapq.heappush(self._queue, ticket)
+                if coalesce is not None:
+                    self._queued_by_coalesce[coalesce] = ticket
+                self._start_workers()
+                self._cond.notify()
+            if key is not None:
+                self._by_key[key] = ticket
+                self._trim_results()
+            return ticket
+
+    def _promote(self, ticket: Ticket, priority: int):
+        """A shared ticket runs at the most urgent priority it was requested with."""
+        if priority < ticket.priority and ticket.started_at is None and not ticket.done():
+            ticket.priority = priority
+            heapq.heapify(self._queue)
+            self._cond.notify()
+
+    def _trim_results(self):
+        """Forget the oldest keyed tickets beyond the count / result-bytes bounds."""
+        cached = sum(_result_bytes(t) for t in self._by_key.values())
+        while self._by_key and (len(self._by_key) > RESULT_CACHE_SIZE or cached > RESULT_CACHE_BYTES):
+            _, ticket = self._by_key.popitem(last=False)
+            cached -= _result_bytes(ticket)
+
+    def _unqueue(self, ticket: Ticket):
+        if ticket.coalesce is not None and self._queued_by_coalesce.get(ticket.coalesce) is ticket:
+            del self._queued_by_coalesce[ticket.coalesce]
+
+    def _shed(self, ticket: Ticket):
+        self.shed += 1
+        self._unqueue(ticket)
+        ticket.fn = ticket.args = None
+        ticket.future.set_exception(Overloaded("too many exports are queued; please try again shortly"))
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._queue:
+                        self._cond.wait()
+                        continue
+                    now = time.monotonic()
+                    self._refill(now)
+                    head = self._queue[0]
+                    if head.priority >= PRIORITY_RESEARCHER and self._running_participant:
+                        self._cond.wait()  # woken when the participant jobs finish
+                        continue
+                    if self._tokens >= head.cost:
+                        break
+                    self._cond.wait((head.cost - self._tokens) / self.rate)
+                ticket = heapq.heappop(self._queue)
+                self._unqueue(ticket)
+                self._tokens -= ticket.cost
+                ticket.started_at = now
+                self._waits.append(ticket.queue_wait)
+                self._running += 1
+                participant = ticket.priority < PRIORITY_RESEARCHER
+                self._running_participant += participant
+            try:
+                if ticket.future.set_running_or_notify_cancel():
+                    try:
+                        ticket.future.set_result(ticket.fn(*ticket.args))
+                    except BaseException as exc:
+                        ticket.future.set_exception(exc)
+            finally:
+                ticket.finished_at = time.monotonic()
+                ticket.fn = ticket.args = None
+                with self._cond:
+                    self._running -= 1
+                    if participant:
+                        self._running_participant -= 1
+                        self._cond.notify()
+                    if ticket.future.cancelled() or ticket.future.exception() is not None:
+                        self.failed += 1
+                    else:
+                        self.completed += 1
+                    self._trim_results()
+
+    def position(self, ticket: Ticket) -> int:
+        """Number of queued jobs that will start before this one (0 once started)."""
+        with self._cond:
+            if ticket.started_at is not None or ticket.done():
+                return 0
+            return sum(1 for other in self._queue if other < ticket)
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits = sorted(self._waits)
+            self._refill(time.monotonic())
+            return {
+                "queued": len(self._queue),
+                "running": self._running,
+                "tokens": round(self._tokens, 2),
+                "completed": self.completed,
+                "failed": self.failed,
+                "shed": self.shed,
+                "wait_p50_s": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                "wait_p95_s": round(waits[int(len(waits) * 0.95)], 3) if waits else 0.0,
+                "wait_max_s": round(waits[-1], 3) if waits else 0.0,
+            }
@@ -0,0 +1,340 @@
+"""
+Lightweight asyncio JSON API over the follow-up engine (standard library only).
+
+    python api_server.py --host 127.0.0.1 --port 8765
+
+Endpoints (JSON in, JSON out):
+
+    GET  /health
+    GET  /stats                  analysis cache and request counters
+    POST /followup               {"resume", "answer", "scenario", "seed"?}
+    POST /value-tag              {"text"}
+    POST /alternative-followup   {"current_followup", "value_tag", "seed"?}
+    POST /sessions               a logged session row (same columns as the app)
+
+The study content registry (hot-reloaded from study_data.json) and the
+analysis cache are module-level, so every request served by this process
+shares them. Session rows are appended to the same CSV log as the Streamlit
+app.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+from http import HTTPStatus
+
+from engine import (
+    analyze_text,
+    find_scenario,
+    generate_alternative_followup,
+    generate_followup,
+    get_analysis_cache,
+)
+from near_duplicates import signature_columns
+from redaction import REDACT_PII, redact_row, strip_pii
+from registry import Registry, default_loader, get_registry
+from session_log import LOG_COLUMNS, LOG_FILE, log_row
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+# Larger bodies are parsed and analyzed in the executor, not on the event loop.
+INLINE_BODY_BYTES = 64 * 1024
+RATING_FIELDS = ("fairness_score", "relevance_score", "comfort_score", "trust_score")
+ACCEPT_AI_CHOICES = ("Yes", "No", "Not sure")
+KEYWORD_FIELDS = ("resume_keywords", "answer_keywords")
+# Columns the server fills in itself; anything a client sends for them is ignored.
+SERVER_FIELDS = ("registry_version", "answer_minhash", "resume_minhash")
+
+
+class ApiError(Exception):
+    """Client error surfaced as a JSON error response."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _text_field(payload: dict, name: str, required: bool = True) -> str:
+    value = payload.get(name, "")
+    if not isinstance(value, str):
+        raise ApiError(400, f"'{name}' must be a string")
+    if required and not value.strip():
+        raise ApiError(400, f"'{name}' is required")
+    return value
+
+
+def _rng(payload: dict):
+    seed = payload.get("seed")
+    if seed is None:
+        return None
+    if not isinstance(seed, int):
+        raise ApiError(400, "'seed' must be an integer")
+    return random.Random(seed)
+
+
+def _scenario(payload: dict, registry: Registry) -> dict:
+    scenario = find_scenario(_text_field(payload, "scenario"), registry)
+    if scenario is None:
+        raise ApiError(400, f"unknown scenario: {payload.get('scenario')!r}")
+    return scenario
+
+
+# ---------------------------------------------------------
+# HANDLERS
+# ---------------------------------------------------------
+def handle_followup(payload: dict) -> dict:
+    registry = get_registry()
+    scenario = _scenario(payload, registry)
+    resume, answer = _text_field(payload, "resume"), _text_field(payload, "answer")
+    if REDACT_PII:
+        # The keywords and reasoning come back to be logged with the session.
+        resume, answer = strip_pii(resume), strip_pii(answer)
+    followup, reasoning, value_tag, confidence, resume_kws, answer_kws = generate_followup(
+        resume,
+        answer,
+        scenario["value"],
+        rng=_rng(payload),
+        registry=registry,
+    )
+    return {
+        "scenario": scenario["name"],
+        "followup_question": followup,
+        "reasoning_summary": reasoning,
+        "value_tag": value_tag,
+        "confidence": confidence,
+        "resume_keywords": resume_kws,
+        "answer_keywords": answer_kws,
+        "registry_version": registry.version,
+    }
+
+
+def handle_value_tag(payload: dict) -> dict:
+    result = analyze_text(_text_field(payload, "text", required=False))
+    return {
+        "value": result["value"],
+        "confidence": result["confidence"],
+        "value_scores": result["value_scores"],
+    }
+
+
+def handle_alternative_followup(payload: dict) -> dict:
+    alt = generate_alternative_followup(
+        _text_field(payload, "current_followup", required=False),
+        _text_field(payload, "value_tag"),
+        rng=_rng(payload),
+    )
+    if not alt:
+        raise ApiError(400, f"unknown value_tag: {payload.get('value_tag')!r}")
+    return {"alternative_question": alt}
+
+
+def session_row(payload: dict) -> dict:
+    """Validate a submitted session and shape it like the app's logged row."""
+    registry = get_registry()
+    scenario = _scenario(payload, registry)
+    row = {col: payload.get(col, "") for col in LOG_COLUMNS}
+    row["timestamp"] = row["timestamp"] or datetime.now().isoformat()
+    row["scenario"] = scenario["name"]
+    row["target_value"] = scenario["value"]
+    row["scenario_prompt_used"] = row["scenario_prompt_used"] or scenario["prompt"]
+    row["registry_version"] = registry.version
+    for field in RATING_FIELDS:
+        score = payload.get(field)
+        if isinstance(score, bool) or not isinstance(score, int) or not 1 <= score <= 5:
+            raise ApiError(400, f"'{field}' must be an integer from 1 to 5")
+    flag_unfair = payload.get("flag_unfair", False)
+    if not isinstance(flag_unfair, bool):
+        raise ApiError(400, "'flag_unfair' must be true or false")
+    row["flag_unfair"] = flag_unfair
+    accept_ai = payload.get("accept_ai", "")
+    if isinstance(accept_ai, bool):
+        accept_ai = "Yes" if accept_ai else "No"
+    elif accept_ai not in ("", *ACCEPT_AI_CHOICES):
+        raise ApiError(400, f"'accept_ai' must be true, false or one of {', '.join(map(repr, ACCEPT_AI_CHOICES))}")
+    row["accept_ai"] = accept_ai
+    for col in KEYWORD_FIELDS:
+        if isinstance(row[col], list) and all(isinstance(k, str) for k in row[col]):
+            row[col] = ", ".join(row[col])
+    for col in LOG_COLUMNS:
+        if col in RATING_FIELDS or col in SERVER_FIELDS or col == "flag_unfair":
+            continue
+        if not isinstance(row[col], str):
+            kind = "a string or a list of strings" if col in KEYWORD_FIELDS else "a string"
+            raise ApiError(400, f"'{col}' must be {kind}")
+    return row
+
+
+def parse_body(body: bytes) -> dict:
+    if not body:
+        return {}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise ApiError(400, "request body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise ApiError(400, "request body must be a JSON object")
+    return payload
+
+
+def redact_and_log(row: dict, log_path: str):
+    """Blocking part of a submission: PII redaction (multi-MB texts), MinHash signatures and the locked append."""
+    if REDACT_PII:
+        row = redact_row(row)
+    row.update(signature_columns(row))
+    log_row(row, log_path)
+
+
+class InterviewApi:
+    """Routes requests to handlers; one instance per server process."""
+
+    def __init__(self, log_path: str = LOG_FILE):
+        self.log_path = log_path
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+            ("POST", "/followup"): handle_followup,
+            ("POST", "/value-tag"): handle_value_tag,
+            ("POST", "/alternative-followup"): handle_alternative_followup,
+            ("POST", "/sessions"): self.submit_session,
+        }
+
+    def health(self, payload: dict) -> dict:
+        return {"status": "ok"}
+
+    def stats(self, payload: dict) -> dict:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "analysis_cache": get_analysis_cache().stats(),
+            "registry": default_loader().stats(),
+        }
+
+    async def submit_session(self, payload: dict):
+        row = session_row(payload)
+        # Redaction, file IO and locking stay off the event loop.
+        await asyncio.get_running_loop().run_in_executor(None, redact_and_log, row, self.log_path)
+        return 201, {"logged": True, "timestamp": row["timestamp"]}
+
+    async def dispatch(self, method: str, path: str, body: bytes):
+        self.requests += 1
+        try:
+            handler = self.routes.get((method, path))
+            if handler is None:
+                if any(p == path for _, p in self.routes):
+                    raise ApiError(405, f"method {method} not allowed")
+                raise ApiError(404, f"no route for {path}")
+            # Multi-MB texts would stall every other connection while they are
+            # parsed and analyzed, so large requests run in the executor.
+            offload = len(body) > INLINE_BODY_BYTES
+            loop = asyncio.get_running_loop()
+            payload = await loop.run_in_executor(None, parse_body, body) if offload else parse_body(body)
+            if offload and not asyncio.iscoroutinefunction(handler):
+                result = await loop.run_in_executor(None, handler, payload)
+            else:
+                result = handler(payload)
+                if asyncio.iscoroutine(result):
+                    result = await result
+            if isinstance(result, tuple):
+                return result
+            return 200, result
+        except ApiError as exc:
+            self.errors += 1
+            return exc.status, {"error": exc.message}
+        except Exception as exc:
+            self.errors += 1
+            return 500, {"error": f"internal error: {exc.__class__.__name__}"}
+
+    # ---------------------------------------------------------
+    # HTTP/1.1 (keep-alive, Content-Length bodies only)
+    # ---------------------------------------------------------
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:  # longer than the reader's line limit
+                    await self._respond(writer, 400, {"error": "request line too long"}, keep_alive=False)
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                try:
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                except ValueError:
+                    await self._respond(writer, 431, {"error": "header line too long"}, keep_alive=False)
+                    break
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413 if length > 0 else 400, {"error": "bad Content-Length"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                path = target.split("?", 1)[0]
+                status, payload = await self.dispatch(method.upper(), path, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host: str, port: int, log_path: str = LOG_FILE):
+    api = InterviewApi(log_path)
+    server = await asyncio.start_server(api.handle_connection, host, port)
+    addrs = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Serving interview API on {addrs}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--log-file", default=LOG_FILE, help="Session log to append submissions to.")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.log_file))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,6 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import os
-import re
-import random
 import io
 
 from docx import Document
@@ -12,6 +10,31 @@ from docx.shared import Pt
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
+from admission import (
+    PRIORITY_BULK,
+    PRIORITY_RESEARCHER,
+    PRIORITY_SESSION,
+    AdmissionController,
+    Overloaded,
+    Ticket,
+)
+from columnar_export import log_to_arrow_ipc_bytes, log_to_parquet_bytes
+from engine import (
+    AnalysisCache,
+    detect_value_tag,
+    generate_alternative_followup,
+    generate_followup,
+    neutralize_question,
+)
+from session_log import log_row
+from session_store import SessionRecord, SessionStore
+from checkpoints import CheckpointStore
+from redaction import REDACT_PII, redact_row, strip_pii
+from near_duplicates import signature_columns
+from ratings_sidecar import load_ratings, read_names, summarize_ratings
+from registry import Registry
+from studies import STUDIES_FILE, Study, StudyHost, UnknownStudy, load_study_configs
+
 # ---------------------------------------------------------
 # PAGE CONFIG + GLOBAL CSS
 # ---------------------------------------------------------
@@ -119,152 +142,13 @@ def card(title, body="", icon=""):
         if body:
             st.write(body)
 
-def extract_keywords(text: str):
-    """Very lightweight keyword extractor (no ML)."""
-    words = re.findall(r"[A-Za-z']+", text.lower())
-    stop = set(
-        [
-            "the","a","an","and","or","to","of","in","on","for","with",
-            "my","your","our","their","you","i","we","was","were","is",
-            "are","that","this","from","have","has","had","been","at",
-            "as","by","it","itself",
-        ]
-    )
-    keywords = [w for w in words if w not in stop and len(w) > 3]
-    return list(dict.fromkeys(keywords))[:8]
-
-VALUES = {
-    "Collaboration": ["team", "together", "support", "conflict", "help"],
-    "Integrity": ["ethical", "honest", "truth", "responsible", "fair"],
-    "Ownership": ["initiative", "led", "managed", "owned", "accountable"],
-    "Customer Focus": ["customer", "client", "user", "service", "needs"],
-    "Data Responsibility": ["data", "privacy", "security", "accuracy", "bias"],
-}
-
-SCENARIOS = [
-    {
-        "name": "Scenario 1 – Collaboration (Team Conflict)",
-        "prompt": "Tell me about a time you worked with a team to solve a difficult problem?",
-        "value": "Collaboration",
-    },
-    {
-        "name": "Scenario 2 – Integrity (Ethical Dilemma)",
-        "prompt": "Describe a situation where you had to choose the ethical option under pressure?",
-        "value": "Integrity",
-    },
-    {
-        "name": "Scenario 3 – Ownership (Taking Initiative)",
-        "prompt": "Tell me about a time you took initiative without being asked?",
-        "value": "Ownership",
-    },
-    {
-        "name": "Scenario 4 – Data Responsibility (Handling Sensitive Info)",
-        "prompt": "Describe a moment when you handled sensitive data or ensured data accuracy?",
-        "value": "Data Responsibility",
-    },
-    {
-        "name": "Scenario 5 – Customer Focus (User Impact)",
-        "prompt": "Tell me about a time you improved a customer or user experience?",
-        "value": "Customer Focus",
-    },
-]
-
-FOLLOWUP_BANK = {
-    "Collaboration": [
-        "What role did you personally play in helping the team succeed?",
-        "How did you handle disagreement or tension in the group?",
-        "What did you learn about teamwork from that experience?",
-    ],
-    "Integrity": [
-        "What made that decision ethically difficult?",
-        "How did you communicate your choice to others?",
-        "Looking back, would you do anything differently?",
-    ],
-    "Ownership": [
-        "What motivated you to take initiative in that situation?",
-        "How did you measure success for that project?",
-        "What obstacles did you face and how did you handle them?",
-    ],
-    "Customer Focus": [
-        "How did you identify what the customer or user actually needed?",
-        "What change did you make and what was its impact?",
-        "How did you gather feedback after your solution?",
-    ],
-    "Data Responsibility": [
-        "How did you make sure the data was accurate or handled safely?",
-        "What risks did you consider when working with that data?",
-        "How did your actions protect stakeholders or users?",
-    ],
-}
-
-def detect_value_tag(answer_text: str):
-    """Heuristic value detector based on word matches."""
-    answer_text = answer_text.lower()
-    scores = {v: 0 for v in VALUES.keys()}
-    for v, kws in VALUES.items():
-        for k in kws:
-            if k in answer_text:
-                scores[v] += 1
-
-    best_value = max(scores, key=scores.get)
-    if scores[best_value] == 0:
-        return "General Professionalism", "Low"
-    elif scores[best_value] <= 2:
-        return best_value, "Medium"
-    else:
-        return best_value, "High"
-
-def generate_followup(resume_text: str, answer_text: str, chosen_value: str):
-    """Generates a follow-up question + explanation using earlier logic."""
-    detected_value, confidence = detect_value_tag(answer_text)
-
-    # Respect the scenario target value; report detected as internal guess only
-    value_tag = chosen_value
-    followup = random.choice(FOLLOWUP_BANK[value_tag])
-
-    resume_kws = extract_keywords(resume_text)
-    answer_kws = extract_keywords(answer_text)
+SESSION_ANALYSIS_CACHE_SIZE = 8
 
-    reasoning = (
-        f"The follow-up targets **{value_tag}** based on the scenario you selected. "
-        f"In your resume, I noticed: {', '.join(resume_kws) or 'no clear keywords'}. "
-        f"In your answer, I noticed: {', '.join(answer_kws) or 'no clear keywords'}. "
-        f"The system's internal guess from your answer alone was **{detected_value}** "
-        f"with **{confidence}** confidence."
-    )
-
-    return followup, reasoning, value_tag, confidence, resume_kws, answer_kws
-
-def neutralize_question(q: str) -> str:
-    """Softens a question if the participant flags it as unfair."""
-    if not q:
-        return ""
-    return "In any context you’re comfortable sharing, " + q[0].lower() + q[1:]
-
-
-def generate_alternative_followup(current_followup: str, value_tag: str) -> str:
-    """Return a different follow-up from the same value bank (simple alternative)."""
-    bank = FOLLOWUP_BANK.get(value_tag, [])
-    if not bank:
-        return ""
-    # Prefer an option different from the current follow-up
-    options = [q for q in bank if q != current_followup] or bank
-    return random.choice(options)
-
-
-# ---------------------------------------------------------
-# LOGGING
-# ---------------------------------------------------------
-LOG_FILE = "interview_logs.csv"
-
-def log_row(row: dict):
-    df_row = pd.DataFrame([row])
-    if os.path.exists(LOG_FILE):
-        df_existing = pd.read_csv(LOG_FILE)
-        df_all = pd.concat([df_existing, df_row], ignore_index=True)
-    else:
-        df_all = df_row
-    df_all.to_csv(LOG_FILE, index=False)
+def session_analysis_cache() -> AnalysisCache:
+    """Small per-session cache so reruns of one participant never touch the shared lock."""
+    if "_analysis_cache" not in st.session_state:
+        st.session_state["_analysis_cache"] = AnalysisCache(SESSION_ANALYSIS_CACHE_SIZE)
+    return st.session_state["_analysis_cache"]
 
 # ---------------------------------------------------------
 # EXPORT HELPERS (CSV / Excel / Word / PDF)
@@ -500,51 +384,236 @@ def row_to_pdf_bytes(row: dict) -> bytes:
     return bio.getvalue()
 
 # ---------------------------------------------------------
-# SESSION STATE (4 steps after consent)
+# EXPORTS (admission-controlled, shared by all sessions)
 # ---------------------------------------------------------
-defaults = {
-    "consent": False,
-
-    # progress flags
-    "resume_done": False,
-    "scenario_answer_done": False,
-    "followup_answer_text": "",
-    "unfair_details": "",
-    "alternative_question": "",
-    "alternative_answer_text": "",
-    "followup_generated": False,
-    "followup_response_done": False,
-    "followup_done": False,
-
-    # step control
-    "active_step": 1,  # 1–4 after consent
-    "exp1_open": True,
-    "exp2_open": False,
-    "exp3_open": False,
-    "exp4_open": False,
-
-    # scenario state
-    "scenario_prompt": "",
-    "scenario_name": SCENARIOS[0]["name"],
-    "prev_scenario_name": None,
+EXPORT_POLL_SECONDS = 1.5
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+@st.cache_resource
+def get_admission() -> AdmissionController:
+    """
+    One admission controller per server process for building download artifacts.
+
+    Every session submits into the same priority queue, so a burst of submits
+    waits its turn instead of starting more builds than the host can afford;
+    a participant's own Word / PDF go ahead of all-sessions and researcher
+    exports. The log write itself never waits on it.
+    """
+    return AdmissionController()
+
+def log_to_excel_bytes(log_path: str, clusters: pd.DataFrame = None) -> bytes:
+    """Read the full log (plus duplicate cluster columns) and render it as an Excel workbook."""
+    df = pd.read_csv(log_path)
+    if clusters is not None:
+        df = pd.concat([df, clusters.reindex(range(len(df))).set_axis(df.index)], axis=1)
+    return df_to_excel_bytes(df)
+
+def study_clusters(study: Study) -> pd.DataFrame:
+    """Near-duplicate cluster ids for every logged session of the study (incremental)."""
+    study.log_tail.refresh()
+    return study.duplicate_index.cluster_frame()
+
+# label, file name, MIME type, builder(log_path, clusters), admission cost
+LOG_EXPORTS = {
+    "excel": ("Excel", "interview_logs.xlsx", XLSX_MIME, log_to_excel_bytes, 4.0),
+    "parquet": ("Parquet", "interview_logs.parquet", "application/vnd.apache.parquet", log_to_parquet_bytes, 2.0),
+    "arrow": ("Arrow IPC stream", "interview_logs.arrows", "application/vnd.apache.arrow.stream", log_to_arrow_ipc_bytes, 2.0),
 }
 
-for k, v in defaults.items():
-    if k not in st.session_state:
-        st.session_state[k] = v
+def build_log_export(kind: str, study: Study) -> bytes:
+    """All-sessions export of the study's log as it is when the job starts."""
+    return LOG_EXPORTS[kind][3](study.log_path, study_clusters(study))
+
+def submit_log_export(kind: str, study: Study, priority: int) -> Ticket:
+    """
+    Queue an all-sessions export. Requests for the same log version share a
+    ticket, and so do requests made while an export is still queued.
+    """
+    log_stat = os.stat(study.log_path)
+    return get_admission().submit(
+        build_log_export, kind, study,
+        priority=priority,
+        cost=LOG_EXPORTS[kind][4],
+        # The size too: appends within one coarse mtime tick keep the mtime.
+        key=(kind, study.log_path, log_stat.st_mtime_ns, log_stat.st_size),
+        coalesce=(kind, study.log_path),
+    )
+
+def render_ticket(ticket: Ticket, label: str, file_name: str, mime: str) -> bool:
+    """Download button once the artifact is built, else its queue state; True when finished."""
+    if not ticket.done():
+        ahead = get_admission().position(ticket)
+        if ahead:
+            st.caption(f"Preparing your download… ({ahead} ahead in the queue, waiting {ticket.queue_wait:.0f}s)")
+        else:
+            st.caption("Preparing your download…")
+        return False
+    try:
+        data = ticket.result()
+    except Overloaded:
+        st.warning(f"The server is busy, so {file_name} was not built. Please try again in a minute.")
+    except Exception:
+        st.error(f"Could not build {file_name}.")
+    else:
+        st.download_button(label, data=data, file_name=file_name, mime=mime)
+    return True
+
+def render_downloads(downloads: list, columns: int = 0):
+    """
+    Render (ticket, label, file_name, mime) downloads, in ``columns`` columns
+    if given. While any is still queued or building, the panel polls as a
+    fragment and reruns the page once all are done.
+    """
+    def panel():
+        slots = st.columns(columns) if columns else [st.container() for _ in downloads]
+        finished = True
+        for slot, (ticket, label, file_name, mime) in zip(slots, downloads):
+            with slot:
+                finished &= render_ticket(ticket, label, file_name, mime)
+        if finished and polling:
+            st.rerun()
+
+    polling = not all(ticket.done() for ticket, *_ in downloads)
+    if polling:
+        st.fragment(run_every=EXPORT_POLL_SECONDS)(panel)()
+    else:
+        panel()
+
+# ---------------------------------------------------------
+# SESSION STATE (4 steps after consent)
+# ---------------------------------------------------------
+# Widget-bound fields: Streamlit owns these keys while the widgets exist, the
+# record is the copy that survives eviction and reconnects.
+WIDGET_FIELDS = (
+    "participant_id",
+    "resume_text",
+    "scenario_name",
+    "answer_text",
+    "followup_answer_text",
+    "unfair_details",
+    "alternative_answer_text",
+)
+
+@st.cache_resource
+def get_study_host() -> StudyHost:
+    """One study host per server process; each study's resources are shared by its sessions."""
+    return StudyHost(load_study_configs(STUDIES_FILE))
+
+def current_study() -> Study:
+    """The study selected by ?study=... (the first configured study by default)."""
+    host = get_study_host()
+    study_id = st.query_params.get("study")
+    try:
+        study = host.get(study_id)
+    except UnknownStudy:
+        st.error(f"Unknown study: {study_id!r}. Please check the link you were given.")
+        st.stop()
+    host.sweep()
+    return study
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """One session store per server process, shared by all sessions."""
+    return SessionStore(checkpoints=CheckpointStore())
+
+def current_session(study: Study) -> SessionRecord:
+    """
+    The participant's SessionRecord, restored by token if it was spilled.
+
+    The token is kept in the URL (?session=...) so a reload or a reconnect
+    after the server dropped the browser session picks up the same record.
+    A token from another study starts a fresh session in this one.
+    """
+    store = get_session_store()
+    token = st.session_state.get("session_token") or st.query_params.get("session")
+    record = store.get(token) if token else None
+    if record is not None and record.study_id != study.study_id:
+        record = None
+        token = None
+        # Nothing typed or cached under the other study may leak into this one.
+        for key in (*WIDGET_FIELDS, "_analysis_cache", "export_tickets", "research_tickets"):
+            st.session_state.pop(key, None)
+    if record is None:
+        registry = study.loader.current()
+        record = store.create(registry.scenarios[0]["name"], token)
+        record.study_id = study.study_id
+        record.registry_version = registry.version
+    st.session_state["session_token"] = record.token
+    if st.query_params.get("session") != record.token:
+        st.query_params["session"] = record.token
+
+    for field in WIDGET_FIELDS:
+        if field in st.session_state:
+            setattr(record, field, st.session_state[field])
+        else:
+            st.session_state[field] = getattr(record, field)
+
+    store.sweep()
+    return record
+
+def session_registry(study: Study, record: SessionRecord) -> Registry:
+    """
+    The study content version this session started on.
+
+    A hot reload mid-session does not change the scenario or question bank
+    under the participant; only sessions pinned to a version that is no
+    longer retained move to the current one.
+    """
+    registry = study.loader.get(record.registry_version)
+    if record.registry_version != registry.version:
+        record.registry_version = registry.version
+    if record.scenario_name not in registry.scenarios_by_name:
+        record.scenario_name = registry.scenarios[0]["name"]
+        st.session_state["scenario_name"] = record.scenario_name
+    return registry
+
+# How often an open tab checks whether its session was spilled while idle.
+IDLE_CHECK_SECONDS = 60.0
+
+def show_paused_session():
+    """Stand-in page for a session that was spilled while its tab stayed open."""
+    if not st.session_state.get("session_paused"):
+        return
+    st.info("Your session was paused after a period of inactivity. Your progress has been saved.")
+    if st.button("Continue where I left off", type="primary"):
+        del st.session_state["session_paused"]
+        st.rerun()
+    st.stop()
+
+@st.fragment(run_every=IDLE_CHECK_SECONDS)
+def watch_idle_session(token: str):
+    """
+    Once the store spills this tab's record, drop the tab's copies of its texts too.
+
+    Popping the widget keys alone would not free them: the browser sends the
+    widget values back with every rerun. Rerunning into the paused page,
+    which has no widgets, makes Streamlit forget them; "Continue" restores
+    the record and refills the widgets from it.
+    """
+    if not get_session_store().is_resident(token):
+        for key in (*WIDGET_FIELDS, "_analysis_cache", "export_tickets", "research_tickets"):
+            st.session_state.pop(key, None)
+        st.session_state["session_paused"] = True
+        st.rerun()
+
+study = current_study()
+show_paused_session()
+rec = current_session(study)
+reg = session_registry(study, rec)
+watch_idle_session(rec.token)
 
 # ---------------------------------------------------------
 # UI HELPERS – NON-CLICKY STEP INDICATOR
 # ---------------------------------------------------------
 def render_step_dots():
     labels = ["Resume", "Pick a scenario", "AI follow‑up", "Feedback"]
-    active = st.session_state.active_step
+    active = rec.active_step
 
     # done logic
     done = {
-        1: st.session_state.resume_done,
-        2: st.session_state.scenario_answer_done,
-        3: st.session_state.followup_response_done,
+        1: rec.resume_done,
+        2: rec.scenario_answer_done,
+        3: rec.followup_response_done,
         4: False,  # feedback is "done" only after save; not tracked separately
     }
 
@@ -583,43 +652,135 @@ with st.sidebar:
     st.text_input("Participant ID (optional)", key="participant_id", placeholder="P01, P02 …")
     st.markdown("---")
     st.caption("Target values in this study:")
-    st.write(", ".join(VALUES.keys()))
+    st.write(", ".join(reg.values.keys()))
     st.markdown("---")
     if st.button("Reset session"):
+        get_session_store().discard(rec.token)
         st.session_state.clear()
+        st.query_params.clear()
+        if study.study_id != get_study_host().default_study_id:
+            st.query_params["study"] = study.study_id
         st.rerun()
 
     st.markdown("---")
     st.subheader("Researcher view (optional)")
-    admin_password = os.environ.get("ADMIN_PASSWORD", "")
+    admin_password = study.admin_password
     if admin_password:
         entered = st.text_input("Admin password", type="password", key="admin_pw")
         if entered == admin_password:
-            if os.path.exists(LOG_FILE):
-                df_logs = pd.read_csv(LOG_FILE)
-                st.metric("Total submissions", len(df_logs))
-                if "participant_id" in df_logs.columns:
-                    non_empty = df_logs["participant_id"].fillna("").astype(str).str.strip()
-                    st.metric("Unique participant IDs", non_empty[non_empty != ""].nunique())
-                if "scenario" in df_logs.columns:
+            if os.path.exists(study.log_path):
+                # Only the records appended since the last refresh are parsed.
+                log_metrics = study.log_tail.metrics()
+                st.metric("Total submissions", log_metrics["total"])
+                if log_metrics["has_participant_column"]:
+                    st.metric("Unique participant IDs", log_metrics["unique_participants"])
+                if log_metrics["has_scenario_column"]:
                     st.caption("Scenario counts")
-                    st.dataframe(df_logs["scenario"].value_counts().rename_axis("scenario").reset_index(name="count"), use_container_width=True)
+                    st.dataframe(pd.DataFrame(log_metrics["scenario_counts"], columns=["scenario", "count"]), use_container_width=True)
+                # Computed from the fixed-width ratings sidecar, not the CSV text.
+                try:
+                    ratings = load_ratings(study.log_path)
+                except ValueError as exc:
+                    st.warning(str(exc))
+                else:
+                    st.caption("Ratings by scenario (means; shares flagged unfair / accepting the AI)")
+                    st.dataframe(summarize_ratings(ratings, read_names(study.log_path)), use_container_width=True)
+                    if len(ratings) != log_metrics["total"]:
+                        st.warning(
+                            f"The ratings sidecar has {len(ratings)} sessions, the log {log_metrics['total']}; "
+                            f"rebuild it with: python ratings_sidecar.py {study.log_path} --rebuild"
+                        )
+                dup_stats = study.duplicate_index.stats()
+                st.caption(
+                    "Near-duplicates: "
+                    f"{dup_stats['answer_duplicate_cluster']['sessions_in_clusters']} sessions in "
+                    f"{dup_stats['answer_duplicate_cluster']['clusters']} answer clusters, "
+                    f"{dup_stats['resume_duplicate_cluster']['sessions_in_clusters']} sessions in "
+                    f"{dup_stats['resume_duplicate_cluster']['clusters']} resume clusters "
+                    "(see the *_duplicate_cluster columns in the Excel / Parquet / Arrow exports)"
+                )
+
+                st.caption("Search sessions")
+                search_query = st.text_input(
+                    "Search sessions",
+                    key="log_search",
+                    placeholder='e.g. "too personal"   unfair:privacy   feedback:"too long"',
+                    label_visibility="collapsed",
+                )
+                if search_query.strip():
+                    try:
+                        found = study.search_index.search(search_query)
+                    except ValueError as exc:
+                        st.error(str(exc))
+                    else:
+                        st.caption(f"{found['total']} matching sessions" + (" (newest 50 shown)" if found["total"] > 50 else ""))
+                        if found["hits"]:
+                            st.dataframe(pd.DataFrame(found["hits"]), use_container_width=True, hide_index=True)
+
+                cache_stats = study.analysis_cache.stats()
+                lookups = cache_stats["session_hits"] + cache_stats["hits"] + cache_stats["misses"]
+                saved = cache_stats["session_hits"] + cache_stats["hits"]
+                st.caption(
+                    f"Analysis cache: {saved / lookups if lookups else 0:.0%} of {lookups} lookups served "
+                    f"({cache_stats['session_hits']} by session caches, {cache_stats['hits']} by the shared cache; "
+                    f"{cache_stats['misses']} misses; {cache_stats['size']}/{cache_stats['maxsize']} entries)"
+                )
+                registry_stats = study.loader.stats()
+                st.caption(
+                    f"Study {study.study_id!r} content: version {registry_stats['version']} "
+                    f"({registry_stats['reloads']} reloads; retained: {', '.join(registry_stats['retained_versions'])})"
+                )
+                if registry_stats["last_error"]:
+                    st.warning(f"Study data reload failed, still serving the last good version: {registry_stats['last_error']}")
+                session_stats = get_session_store().stats()
+                st.caption(
+                    f"Sessions: {session_stats['in_memory']} in memory, {session_stats['spilled']} spilled to disk; "
+                    f"~{session_stats['mean_bytes_per_session'] / 1024:.1f} KB per session "
+                    f"(max {session_stats['max_bytes_per_session'] / 1024:.1f} KB); "
+                    f"{session_stats['expired']} spilled sessions expired"
+                )
+                host_stats = get_study_host().stats()
+                st.caption(
+                    f"Studies: {len(host_stats['open'])} of {host_stats['configured']} open "
+                    f"({host_stats['evicted']} closed while idle)"
+                )
+                st.caption(
+                    f"Log reader: {log_metrics['offset'] / 1024:.0f} KB parsed, "
+                    f"{log_metrics['last_bytes_read']} new bytes this refresh, {log_metrics['rescans']} full rescans"
+                )
+                admission_stats = get_admission().stats()
+                st.caption(
+                    f"Export queue: {admission_stats['queued']} queued, {admission_stats['running']} building, "
+                    f"{admission_stats['shed']} shed; wait p50 {admission_stats['wait_p50_s']:.1f}s, "
+                    f"p95 {admission_stats['wait_p95_s']:.1f}s, max {admission_stats['wait_max_s']:.1f}s"
+                )
 
-                with open(LOG_FILE, "rb") as f:
+                with open(study.log_path, "rb") as f:
                     st.download_button("Download research CSV (all sessions)", data=f, file_name="interview_logs.csv", mime="text/csv")
 
-                st.download_button(
-                    "Download research Excel (all sessions)",
-                    data=df_to_excel_bytes(df_logs),
-                    file_name="interview_logs.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                )
+                # Built only on request, after any participant downloads, once per log version.
+                if st.button("Prepare exports", key="btn_research_exports"):
+                    st.session_state["research_tickets"] = [
+                        (submit_log_export(kind, study, PRIORITY_RESEARCHER), f"Download research {label} (all sessions)", file_name, mime)
+                        for kind, (label, file_name, mime, _, _) in LOG_EXPORTS.items()
+                    ]
+                research_tickets = st.session_state.get("research_tickets")
+                if research_tickets:
+                    render_downloads(research_tickets)
             else:
                 st.info("No submissions yet (log file not found).")
         elif entered:
             st.error("Incorrect password.")
+    elif study.admin_password_env:
+        st.caption(
+            f"To enable researcher summaries, set the environment variable "
+            f"{study.admin_password_env} on the server."
+        )
     else:
-        st.caption("To enable researcher summaries, set an environment variable ADMIN_PASSWORD on the server.")
+        st.caption(
+            f"To enable researcher summaries, add an \"admin_password_env\" to study "
+            f"'{study.study_id}' in {STUDIES_FILE} and set that environment variable on the server."
+        )
 
 # ---------------------------------------------------------
 # HEADER + STUDY ABOUT (moved up) + PROGRESS (redesigned)
@@ -635,8 +796,8 @@ with st.expander("What is this study about?", expanded=False):
         "- No real name is required."
     )
 
-st.markdown(f"**Progress: Step {st.session_state.active_step} of 4**")
-st.progress((st.session_state.active_step - 1) / 4)
+st.markdown(f"**Progress: Step {rec.active_step} of 4**")
+st.progress((rec.active_step - 1) / 4)
 render_step_dots()
 st.caption("Only the current step is expanded. You can re-open earlier steps any time to review or edit.")
 
@@ -656,11 +817,11 @@ card(
 
 consent = st.checkbox(
     "I have read this summary and I agree to take part in this prototype study.",
-    value=st.session_state.consent,
+    value=rec.consent,
 )
-st.session_state.consent = consent
+rec.consent = consent
 
-if not st.session_state.consent:
+if not rec.consent:
     st.info("Please give your consent above to start the interview steps.")
     st.stop()
 
@@ -668,11 +829,11 @@ if not st.session_state.consent:
 # STEP 1 – RESUME / EXPERIENCE
 # ---------------------------------------------------------
 step1_label = "Step 1 – Resume / Experience Context"
-if st.session_state.resume_done and st.session_state.active_step != 1:
-    rt_len = len(st.session_state.get("resume_text", "").strip())
+if rec.resume_done and rec.active_step != 1:
+    rt_len = len(rec.resume_text.strip())
     step1_label += f"  ✅ (about {rt_len} characters)"
 
-with st.expander(step1_label, expanded=st.session_state.exp1_open):
+with st.expander(step1_label, expanded=rec.exp1_open):
     card(
         "",
         icon="📄",
@@ -693,31 +854,32 @@ with st.expander(step1_label, expanded=st.session_state.exp1_open):
         ),
     )
 
-    if st.session_state.get("resume_text"):
-        st.caption(f"Characters provided: {len(st.session_state['resume_text'])}")
+    if rec.resume_text:
+        st.caption(f"Characters provided: {len(rec.resume_text)}")
 
     if st.button("Save and continue", key="btn_step1"):
-        if not st.session_state["resume_text"].strip():
+        if not rec.resume_text.strip():
             st.error("Please add at least a short summary or resume text before continuing.")
         else:
-            st.session_state.resume_done = True
-            st.session_state.active_step = 2
-            st.session_state.exp1_open = False
-            st.session_state.exp2_open = True
+            rec.resume_done = True
+            rec.active_step = 2
+            rec.exp1_open = False
+            rec.exp2_open = True
+            get_session_store().checkpoint(rec)
             st.success("Resume saved. Moving to Step 2.")
             st.rerun()
 
 # ---------------------------------------------------------
 # STEP 2 – PICK A SCENARIO + ANSWER (save happens AFTER answer)
 # ---------------------------------------------------------
-if st.session_state.resume_done:
+if rec.resume_done:
     step2_label = "Step 2 – Pick a scenario"
-    if st.session_state.scenario_answer_done and st.session_state.active_step != 2:
+    if rec.scenario_answer_done and rec.active_step != 2:
         step2_label += "  ✅ (scenario + answer saved)"
 
-    with st.expander(step2_label, expanded=st.session_state.exp2_open):
+    with st.expander(step2_label, expanded=rec.exp2_open):
 
-        scenario_names = [s["name"] for s in SCENARIOS]
+        scenario_names = list(reg.scenarios_by_name)
 
         st.selectbox(
             "Pick a scenario",
@@ -726,15 +888,15 @@ if st.session_state.resume_done:
         )
 
         # Reset prompt when scenario changes
-        if st.session_state.prev_scenario_name != st.session_state.scenario_name:
-            base_scenario = next(s for s in SCENARIOS if s["name"] == st.session_state.scenario_name)
-            st.session_state.scenario_prompt = base_scenario["prompt"]
-            st.session_state.prev_scenario_name = st.session_state.scenario_name
+        if rec.prev_scenario_name != rec.scenario_name:
+            base_scenario = reg.scenarios_by_name[rec.scenario_name]
+            rec.scenario_prompt = base_scenario["prompt"]
+            rec.prev_scenario_name = rec.scenario_name
 
         # Scenario question (read-only; styled like a dropdown)
         st.markdown("**Scenario Question**")
         st.markdown(
-            f"<div class='select-like'>{st.session_state.get('scenario_prompt', '')}</div>",
+            f"<div class='select-like'>{rec.scenario_prompt}</div>",
             unsafe_allow_html=True,
         )
 
@@ -748,15 +910,16 @@ if st.session_state.resume_done:
         )
 
         if st.button("Save scenario + response and continue", key="btn_step2"):
-            if not st.session_state.get("scenario_prompt", "").strip():
+            if not rec.scenario_prompt.strip():
                 st.error("Scenario prompt is empty. Please select a scenario or enter a prompt.")
-            elif not st.session_state.get("answer_text", "").strip():
+            elif not rec.answer_text.strip():
                 st.error("Please write your response before continuing.")
             else:
-                st.session_state.scenario_answer_done = True
-                st.session_state.active_step = 3
-                st.session_state.exp2_open = False
-                st.session_state.exp3_open = True
+                rec.scenario_answer_done = True
+                rec.active_step = 3
+                rec.exp2_open = False
+                rec.exp3_open = True
+                get_session_store().checkpoint(rec)
                 st.success("Saved. Moving to Step 3.")
                 st.rerun()
 else:
@@ -765,24 +928,24 @@ else:
 # ---------------------------------------------------------
 # STEP 3 – AI FOLLOW-UP + EXPLAINABILITY (was Step 4)
 # ---------------------------------------------------------
-if st.session_state.scenario_answer_done:
+if rec.scenario_answer_done:
     step3_label = "Step 3 – AI Follow-Up Question & Explanation"
-    if st.session_state.followup_done and st.session_state.active_step != 3:
+    if rec.followup_done and rec.active_step != 3:
         step3_label += "  ✅ (question generated)"
 
-    with st.expander(step3_label, expanded=st.session_state.exp3_open):
+    with st.expander(step3_label, expanded=rec.exp3_open):
         card(
             "",
             icon="✨",
             body="Now the AI generates a follow-up question and explains why it chose it.",
         )
 
-        resume_text = st.session_state.get("resume_text", "")
-        answer_text = st.session_state.get("answer_text", "")
-        chosen_scenario = next(
-            s for s in SCENARIOS
-            if s["name"] == st.session_state.get("scenario_name", SCENARIOS[0]["name"])
-        )
+        resume_text = rec.resume_text
+        answer_text = rec.answer_text
+        # Analysis only sees the texts with PII removed: its keywords and reasoning are logged.
+        analyzed_resume = strip_pii(resume_text) if REDACT_PII else resume_text
+        analyzed_answer = strip_pii(answer_text) if REDACT_PII else answer_text
+        chosen_scenario = reg.scenarios_by_name[rec.scenario_name]
 
         gen = st.button("Generate / Refresh Follow-Up Question", key="btn_generate", type="primary")
 
@@ -791,27 +954,28 @@ if st.session_state.scenario_answer_done:
                 st.error("Please make sure both your resume/experience and your answer are filled in.")
             else:
                 followup, reasoning, value_tag, confidence, resume_kws, answer_kws = generate_followup(
-                    resume_text, answer_text, chosen_scenario["value"]
+                    analyzed_resume, analyzed_answer, chosen_scenario["value"], session_analysis_cache(),
+                    registry=reg, shared_cache=study.analysis_cache,
                 )
-                st.session_state["followup"] = followup
-                st.session_state["reasoning"] = reasoning
-                st.session_state["value_tag"] = value_tag
-                st.session_state["confidence"] = confidence
-                st.session_state["resume_kws"] = resume_kws
-                st.session_state["answer_kws"] = answer_kws
+                rec.followup = followup
+                rec.reasoning = reasoning
+                rec.value_tag = value_tag
+                rec.confidence = confidence
+                rec.resume_kws = resume_kws
+                rec.answer_kws = answer_kws
 
                 # Generate the follow-up, but keep the participant on Step 3.
-                st.session_state.followup_generated = True
-                st.session_state.followup_response_done = False
-                st.session_state.followup_done = False
-                st.session_state.active_step = 3
-                st.session_state.exp3_open = True
-                st.session_state.exp4_open = False
+                rec.followup_generated = True
+                rec.followup_response_done = False
+                rec.followup_done = False
+                rec.active_step = 3
+                rec.exp3_open = True
+                rec.exp4_open = False
 
                 st.success("Follow-up generated. Please respond to it below, then continue to Step 4.")
                 st.rerun()
 
-        if "followup" in st.session_state:
+        if rec.followup:
             st.markdown(
                 f"""
                 <div style='margin-top:0.5rem; margin-bottom:0.5rem;
@@ -823,7 +987,7 @@ if st.session_state.scenario_answer_done:
                         AI Follow-Up Question
                     </div>
                     <div style='font-size:1rem; color:#e5e7eb;'>
-                        <b>{st.session_state['followup']}</b>
+                        <b>{rec.followup}</b>
                     </div>
                 </div>
                 """,
@@ -839,14 +1003,15 @@ if st.session_state.scenario_answer_done:
             )
 
             if st.button("Save follow-up response and continue to Step 4", key="btn_followup_answer"):
-                if not st.session_state.get("followup_answer_text", "").strip():
+                if not rec.followup_answer_text.strip():
                     st.error("Please respond to the AI follow-up question before continuing.")
                 else:
-                    st.session_state.followup_response_done = True
-                    st.session_state.followup_done = True
-                    st.session_state.active_step = 4
-                    st.session_state.exp3_open = False
-                    st.session_state.exp4_open = True
+                    rec.followup_response_done = True
+                    rec.followup_done = True
+                    rec.active_step = 4
+                    rec.exp3_open = False
+                    rec.exp4_open = True
+                    get_session_store().checkpoint(rec)
                     st.success("Saved. Moving to Step 4.")
                     st.rerun()
 
@@ -855,30 +1020,32 @@ if st.session_state.scenario_answer_done:
                 col1, col2 = st.columns(2)
                 with col1:
                     st.markdown("**Target value (scenario)**")
-                    st.write(st.session_state.get("value_tag", "N/A"))
-                    dv, conf = detect_value_tag(answer_text)
+                    st.write(rec.value_tag)
+                    dv, conf = detect_value_tag(
+                        analyzed_answer, session_analysis_cache(), registry=reg, shared_cache=study.analysis_cache
+                    )
                     st.markdown("**System value guess (from your answer)**")
                     st.write(f"{dv} ({conf} confidence)")
 
                 with col2:
                     st.markdown("**Resume keywords detected**")
-                    st.write(", ".join(st.session_state.get("resume_kws", [])) or "None detected")
+                    st.write(", ".join(rec.resume_kws) or "None detected")
 
                     st.markdown("**Answer keywords detected**")
-                    st.write(", ".join(st.session_state.get("answer_kws", [])) or "None detected")
+                    st.write(", ".join(rec.answer_kws) or "None detected")
 
                 st.markdown("**Reasoning summary**")
-                st.write(st.session_state.get("reasoning", ""))
+                st.write(rec.reasoning)
 else:
     st.info("Complete Step 2 first. Step 3 will appear after you save your scenario + response.")
 
 # ---------------------------------------------------------
 # STEP 4 – FAIRNESS & EXPERIENCE FEEDBACK (was Step 5)
 # ---------------------------------------------------------
-if st.session_state.followup_done:
+if rec.followup_done:
     step4_label = "Step 4 – Fairness & Experience Feedback"
 
-    with st.expander(step4_label, expanded=st.session_state.exp4_open):
+    with st.expander(step4_label, expanded=rec.exp4_open):
         card(
             "",
             icon="⚖️",
@@ -886,7 +1053,7 @@ if st.session_state.followup_done:
         )
 
         st.markdown("**Follow-up question shown to you:**")
-        st.write(f"_{st.session_state['followup']}_")
+        st.write(f"_{rec.followup}_")
 
         flag_unfair = st.checkbox("I felt this follow-up was unfair, biased, or uncomfortable.")
 
@@ -894,7 +1061,7 @@ if st.session_state.followup_done:
         neutral_q = ""
         if flag_unfair:
             # 1) Start with a softened rephrasing (always begins with the comfort-preface)
-            neutral_q = neutralize_question(st.session_state["followup"])
+            neutral_q = neutralize_question(rec.followup)
             st.info("In any context you’re comfortable sharing:")
 
             # 2) Optional: what felt unfair / uncomfortable (about original or rephrased)
@@ -904,7 +1071,7 @@ if st.session_state.followup_done:
                 height=90,
                 placeholder="Example: too personal, unclear, stereotype risk, or not relevant to my response…",
             )
-            unfair_comment = st.session_state.get("unfair_details", "")
+            unfair_comment = rec.unfair_details
 
             # 3) Optional: alternative question (based on the selected scenario)
             st.markdown("**Optional: Alternative question**")
@@ -912,15 +1079,16 @@ if st.session_state.followup_done:
             with col_alt_a:
                 if st.button("Generate alternative", key="btn_alt_q"):
                     alt = generate_alternative_followup(
-                        current_followup=st.session_state.get("followup", ""),
-                        value_tag=st.session_state.get("value_tag", "Collaboration"),
+                        current_followup=rec.followup,
+                        value_tag=rec.value_tag,
+                        registry=reg,
                     )
-                    st.session_state["alternative_question"] = alt
+                    rec.alternative_question = alt
                     st.session_state["alternative_answer_text"] = ""
                     st.rerun()
 
             with col_alt_b:
-                alt_q = st.session_state.get("alternative_question", "")
+                alt_q = rec.alternative_question
                 if alt_q:
                     st.write(f"**{alt_q}**")
                 else:
@@ -971,83 +1139,89 @@ if st.session_state.followup_done:
         )
 
         if st.button("Save and submit feedback", key="btn_save_feedback", type="primary"):
-            chosen_scenario = next(
-                s for s in SCENARIOS
-                if s["name"] == st.session_state.get("scenario_name", SCENARIOS[0]["name"])
-            )
-            scenario_text = st.session_state.get("scenario_prompt", chosen_scenario["prompt"])
+            chosen_scenario = reg.scenarios_by_name[rec.scenario_name]
+            scenario_text = rec.scenario_prompt or chosen_scenario["prompt"]
 
             row = {
                 "timestamp": datetime.now().isoformat(),
-                "participant_id": st.session_state.get("participant_id", ""),
+                "participant_id": rec.participant_id,
                 "scenario": chosen_scenario["name"],
                 "scenario_prompt_used": scenario_text,
                 "target_value": chosen_scenario["value"],
-                "resume_text": st.session_state.get("resume_text", ""),
-                "answer_text": st.session_state.get("answer_text", ""),
-                "followup_answer_text": st.session_state.get("followup_answer_text", ""),
-                "followup_question": st.session_state.get("followup", ""),
-                "reasoning_summary": st.session_state.get("reasoning", ""),
-                "resume_keywords": ", ".join(st.session_state.get("resume_kws", [])),
-                "answer_keywords": ", ".join(st.session_state.get("answer_kws", [])),
-                "value_tag": st.session_state.get("value_tag", ""),
-                "confidence": st.session_state.get("confidence", ""),
+                "resume_text": rec.resume_text,
+                "answer_text": rec.answer_text,
+                "followup_answer_text": rec.followup_answer_text,
+                "followup_question": rec.followup,
+                "reasoning_summary": rec.reasoning,
+                "resume_keywords": ", ".join(rec.resume_kws),
+                "answer_keywords": ", ".join(rec.answer_kws),
+                "value_tag": rec.value_tag,
+                "confidence": rec.confidence,
                 "fairness_score": fairness_score,
                 "relevance_score": relevance_score,
                 "comfort_score": comfort_score,
                 "trust_score": trust_score,
                 "flag_unfair": flag_unfair,
                 "unfair_comment": unfair_comment,
-                "alternative_question": st.session_state.get("alternative_question", ""),
-                "alternative_answer_text": st.session_state.get("alternative_answer_text", ""),
+                "alternative_question": rec.alternative_question,
+                "alternative_answer_text": rec.alternative_answer_text,
                 "neutralized_question": neutral_q,
                 "accept_ai": accept_ai,
                 "open_feedback": open_feedback,
+                "registry_version": reg.version,
             }
 
-            log_row(row)
-            st.success("Saved! Your feedback has been added to interview_logs.csv.")
+            # Logged and exported copies never carry contact details.
+            if REDACT_PII:
+                row = redact_row(row)
+            # Signatures of the text as logged, for near-duplicate detection.
+            row.update(signature_columns(row))
+
+            log_row(row, study.log_path)
+            get_session_store().complete(rec.token)
 
             # --- Downloads ---
             # Best default: CSV (simple + universal) + Excel (for analysis).
             # Word/PDF: best for single-session sharing/appendix.
-            if os.path.exists(LOG_FILE):
-                df_all = pd.read_csv(LOG_FILE)
-
-                col1, col2, col3, col4 = st.columns(4)
-
-                with col1:
-                    with open(LOG_FILE, "rb") as f:
+            # The row is already saved; the artifacts are queued and shown
+            # below (on this and later reruns) as each one is built.
+            admission = get_admission()
+            st.session_state["export_tickets"] = [
+                (
+                    submit_log_export("excel", study, PRIORITY_BULK),
+                    "Download Excel (all sessions)",
+                    "interview_logs.xlsx",
+                    XLSX_MIME,
+                ),
+                (
+                    admission.submit(row_to_word_bytes, row, priority=PRIORITY_SESSION),
+                    "Download Word (this session)",
+                    "interview_session_summary.docx",
+                    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                ),
+                (
+                    admission.submit(row_to_pdf_bytes, row, priority=PRIORITY_SESSION),
+                    "Download PDF (this session)",
+                    "interview_session_summary.pdf",
+                    "application/pdf",
+                ),
+            ]
+
+        export_tickets = st.session_state.get("export_tickets")
+        if export_tickets:
+            st.success(f"Saved! Your feedback has been added to {os.path.basename(study.log_path)}.")
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                if os.path.exists(study.log_path):
+                    with open(study.log_path, "rb") as f:
                         st.download_button(
                             "Download CSV (all sessions)",
                             data=f,
                             file_name="interview_logs.csv",
                             mime="text/csv",
                         )
-
-                with col2:
-                    st.download_button(
-                        "Download Excel (all sessions)",
-                        data=df_to_excel_bytes(df_all),
-                        file_name="interview_logs.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    )
-
-                with col3:
-                    st.download_button(
-                        "Download Word (this session)",
-                        data=row_to_word_bytes(row),
-                        file_name="interview_session_summary.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    )
-
-                with col4:
-                    st.download_button(
-                        "Download PDF (this session)",
-                        data=row_to_pdf_bytes(row),
-                        file_name="interview_session_summary.pdf",
-                        mime="application/pdf",
-                    )
+            with col2:
+                render_downloads(export_tickets, columns=3)
 
             st.caption("You can close this window or use the reset button in the sidebar to start again.")
 
@@ -0,0 +1,126 @@
+"""
+Compare file size and pandas load time of the log exports (CSV, Excel,
+Parquet, Arrow IPC) on a synthetic log.
+
+    python bench_exports.py --rows 100000
+    python bench_exports.py --rows 100000 --skip-excel   # Excel is slow at this size
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+
+from columnar_export import write_log_arrow_ipc, write_log_parquet
+
+_WORDS = (
+    "team data customer project analytics privacy led managed support conflict "
+    "sql reporting dashboard stakeholder accuracy initiative ethical service users "
+    "finance operations python security bias process improved delivered"
+).split()
+
+_SCENARIOS = [
+    ("Scenario 1 – Collaboration (Team Conflict)", "Collaboration"),
+    ("Scenario 2 – Integrity (Ethical Dilemma)", "Integrity"),
+    ("Scenario 3 – Ownership (Taking Initiative)", "Ownership"),
+    ("Scenario 4 – Data Responsibility (Handling Sensitive Info)", "Data Responsibility"),
+    ("Scenario 5 – Customer Focus (User Impact)", "Customer Focus"),
+]
+
+
+def _text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n_words))
+
+
+def make_synthetic_log(path: str, rows: int, seed: int = 0, chunk_rows: int = 10_000):
+    """Write a synthetic log with the same columns as the app's log_row."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    header = True
+    for offset in range(0, rows, chunk_rows):
+        batch = []
+        for i in range(offset, min(rows, offset + chunk_rows)):
+            scenario, value = rng.choice(_SCENARIOS)
+            flagged = rng.random() < 0.2
+            batch.append(
+                {
+                    "timestamp": (start + timedelta(seconds=i * 37)).isoformat(),
+                    "participant_id": f"P{i:06d}",
+                    "scenario": scenario,
+                    "scenario_prompt_used": f"Prompt for {value}?",
+                    "target_value": value,
+                    "resume_text": _text(rng, 100),
+                    "answer_text": _text(rng, 60),
+                    "followup_answer_text": _text(rng, 30),
+                    "followup_question": f"Follow-up {rng.randint(1, 3)} for {value}?",
+                    "reasoning_summary": _text(rng, 45),
+                    "resume_keywords": ", ".join(rng.sample(_WORDS, 8)),
+                    "answer_keywords": ", ".join(rng.sample(_WORDS, 8)),
+                    "value_tag": value,
+                    "confidence": rng.choice(["Low", "Medium", "High"]),
+                    "fairness_score": rng.randint(1, 5),
+                    "relevance_score": rng.randint(1, 5),
+                    "comfort_score": rng.randint(1, 5),
+                    "trust_score": rng.randint(1, 5),
+                    "flag_unfair": flagged,
+                    "unfair_comment": _text(rng, 12) if flagged else "",
+                    "alternative_question": "",
+                    "alternative_answer_text": "",
+                    "neutralized_question": "",
+                    "accept_ai": rng.choice(["Yes", "No", "Not sure"]),
+                    "open_feedback": _text(rng, 15),
+                }
+            )
+        pd.DataFrame(batch).to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--skip-excel", action="store_true")
+    parser.add_argument("--out-dir", default=None, help="Keep generated files here (default: temp dir).")
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or tempfile.mkdtemp(prefix="bench_exports_")
+    os.makedirs(out_dir, exist_ok=True)
+    csv_path = os.path.join(out_dir, "interview_logs.csv")
+    parquet_path = os.path.join(out_dir, "interview_logs.parquet")
+    arrow_path = os.path.join(out_dir, "interview_logs.arrows")
+    excel_path = os.path.join(out_dir, "interview_logs.xlsx")
+
+    _, t_gen = _timed(lambda: make_synthetic_log(csv_path, args.rows))
+    print(f"generated {args.rows} rows in {t_gen:.1f}s -> {out_dir}")
+
+    results = []
+    _, t_write = _timed(lambda: write_log_parquet(csv_path, parquet_path))
+    results.append(("parquet", parquet_path, t_write, lambda: pd.read_parquet(parquet_path)))
+    _, t_write = _timed(lambda: write_log_arrow_ipc(csv_path, arrow_path))
+    results.append(
+        ("arrow ipc", arrow_path, t_write, lambda: pa.ipc.open_stream(arrow_path).read_pandas())
+    )
+    if not args.skip_excel:
+        _, t_write = _timed(lambda: pd.read_csv(csv_path).to_excel(excel_path, index=False, sheet_name="logs"))
+        results.append(("excel", excel_path, t_write, lambda: pd.read_excel(excel_path)))
+    results.insert(0, ("csv", csv_path, 0.0, lambda: pd.read_csv(csv_path)))
+
+    print(f"{'format':<10} {'size MB':>9} {'write s':>9} {'load s':>9}")
+    for name, path, t_write, load in results:
+        df, t_load = _timed(load)
+        assert len(df) == args.rows, (name, len(df))
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{name:<10} {size_mb:>9.1f} {t_write:>9.2f} {t_load:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
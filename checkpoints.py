@@ -0,0 +1,131 @@
+"""
+Durable checkpoints of in-progress sessions (SQLite, standard library).
+
+Each "Save and continue" writes only the fields that changed since the last
+checkpoint, as one small JSON row keyed by (session token, sequence number).
+After a server restart, a returning participant's record is rebuilt by
+folding that token's rows in order; the primary-key index makes this a short
+range scan, so nothing has to be loaded at startup. Chains are folded into a
+single snapshot row once they get long, and a token's rows are deleted once
+its session has been submitted to the log. Abandoned sessions are never
+submitted, so tokens not saved for ``CHECKPOINT_MAX_AGE`` seconds are
+deleted too (when the store opens, then from ``SessionStore.sweep``).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CHECKPOINT_DB = os.environ.get("CHECKPOINT_DB", "session_checkpoints.sqlite3")
+COMPACT_AFTER = 8
+CHECKPOINT_MAX_AGE = float(os.environ.get("CHECKPOINT_MAX_AGE", "86400"))
+EXPIRE_INTERVAL = 600.0
+
+# Not worth persisting: changes on every request.
+_VOLATILE_FIELDS = {"last_seen"}
+
+
+class CheckpointStore:
+    """Append-only per-token diffs with fold-on-read and automatic compaction."""
+
+    def __init__(self, db_path: str = CHECKPOINT_DB, max_age: float = CHECKPOINT_MAX_AGE):
+        self.db_path = db_path
+        self.max_age = max_age
+        self.expired = 0
+        self._last_expire = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " token TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " saved_at REAL NOT NULL,"
+            " diff TEXT NOT NULL,"
+            " PRIMARY KEY (token, seq))"
+        )
+        self.expire(force=True)
+
+    def _rows(self, token: str):
+        return self._conn.execute(
+            "SELECT seq, diff FROM checkpoints WHERE token = ? ORDER BY seq", (token,)
+        ).fetchall()
+
+    @staticmethod
+    def _fold(rows) -> dict:
+        state = {}
+        for _, diff in rows:
+            state.update(json.loads(diff))
+        return state
+
+    def load(self, token: str):
+        """Latest checkpointed state for a token, or None if there is none."""
+        with self._lock:
+            rows = self._rows(token)
+        return self._fold(rows) if rows else None
+
+    def save(self, token: str, state: dict) -> int:
+        """
+        Record the fields of ``state`` that differ from the last checkpoint.
+
+        Returns the number of changed fields (0 means nothing was written).
+        """
+        state = {k: v for k, v in state.items() if k not in _VOLATILE_FIELDS}
+        with self._lock:
+            rows = self._rows(token)
+            previous = self._fold(rows)
+            diff = {k: v for k, v in state.items() if previous.get(k, object()) != v}
+            if not diff:
+                return 0
+            seq = rows[-1][0] + 1 if rows else 0
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    "INSERT INTO checkpoints (token, seq, saved_at, diff) VALUES (?, ?, ?, ?)",
+                    (token, seq, time.time(), json.dumps(diff, ensure_ascii=False)),
+                )
+                if len(rows) + 1 > COMPACT_AFTER:
+                    previous.update(diff)
+                    self._conn.execute("DELETE FROM checkpoints WHERE token = ? AND seq < ?", (token, seq))
+                    self._conn.execute(
+                        "UPDATE checkpoints SET diff = ? WHERE token = ? AND seq = ?",
+                        (json.dumps(previous, ensure_ascii=False), token, seq),
+                    )
+            return len(diff)
+
+    def delete(self, token: str):
+        """Drop all checkpoints of a token (submitted or reset)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE token = ?", (token,))
+
+    def expire(self, force: bool = False) -> int:
+        """
+        Drop tokens whose latest checkpoint is older than ``max_age``;
+        returns the number of tokens removed. Rate-limited unless forced.
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_expire < EXPIRE_INTERVAL:
+                return 0
+            self._last_expire = now
+            with self._conn:
+                self._conn.execute("BEGIN")
+                stale = [
+                    token
+                    for (token,) in self._conn.execute(
+                        "SELECT token FROM checkpoints GROUP BY token HAVING MAX(saved_at) < ?",
+                        (now - self.max_age,),
+                    )
+                ]
+                self._conn.executemany("DELETE FROM checkpoints WHERE token = ?", [(t,) for t in stale])
+            self.expired += len(stale)
+            return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions, rows = self._conn.execute(
+                "SELECT COUNT(DISTINCT token), COUNT(*) FROM checkpoints"
+            ).fetchone()
+        return {"sessions": sessions, "rows": rows, "expired": self.expired}
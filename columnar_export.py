@@ -0,0 +1,169 @@
+"""
+Columnar (Parquet / Arrow IPC) exports of the session log.
+
+The CSV log keeps everything as text; these exports carry a typed schema so
+pandas / R load them without re-parsing: dictionary-encoded (categorical)
+scenario and value fields, int8 ratings, boolean flag_unfair and a real
+timestamp column. The log is read in chunks and each chunk becomes one
+Parquet row group / Arrow record batch, so memory stays bounded by the chunk
+size rather than the log size.
+"""
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ratings_sidecar import parse_bool
+
+ROW_GROUP_ROWS = 10_000
+
+_CATEGORY = pa.dictionary(pa.int8(), pa.string())
+_CATEGORY_WIDE = pa.dictionary(pa.int16(), pa.string())
+
+LOG_SCHEMA = pa.schema(
+    [
+        ("timestamp", pa.timestamp("us")),
+        ("participant_id", pa.string()),
+        ("scenario", _CATEGORY),
+        ("scenario_prompt_used", _CATEGORY_WIDE),
+        ("target_value", _CATEGORY),
+        ("resume_text", pa.string()),
+        ("answer_text", pa.string()),
+        ("followup_answer_text", pa.string()),
+        ("followup_question", _CATEGORY_WIDE),
+        ("reasoning_summary", pa.string()),
+        ("resume_keywords", pa.string()),
+        ("answer_keywords", pa.string()),
+        ("value_tag", _CATEGORY),
+        ("confidence", _CATEGORY),
+        ("fairness_score", pa.int8()),
+        ("relevance_score", pa.int8()),
+        ("comfort_score", pa.int8()),
+        ("trust_score", pa.int8()),
+        ("flag_unfair", pa.bool_()),
+        ("unfair_comment", pa.string()),
+        ("alternative_question", _CATEGORY_WIDE),
+        ("alternative_answer_text", pa.string()),
+        ("neutralized_question", pa.string()),
+        ("accept_ai", _CATEGORY),
+        ("open_feedback", pa.string()),
+        ("registry_version", _CATEGORY),
+        ("answer_minhash", pa.string()),
+        ("resume_minhash", pa.string()),
+        # Derived at export time (near_duplicates), not stored in the log.
+        ("answer_duplicate_cluster", pa.int32()),
+        ("resume_duplicate_cluster", pa.int32()),
+    ]
+)
+
+
+def _column_to_array(series: pd.Series, pa_type: pa.DataType) -> pa.Array:
+    """Convert one CSV text column into a typed Arrow array."""
+    if pa.types.is_timestamp(pa_type):
+        parsed = pd.to_datetime(series, errors="coerce", format="ISO8601")
+        return pa.array(parsed, type=pa_type, from_pandas=True)
+    if pa.types.is_integer(pa_type):
+        return pa.array(pd.to_numeric(series, errors="coerce"), type=pa_type, from_pandas=True)
+    if pa.types.is_boolean(pa_type):
+        return pa.array([parse_bool(v) for v in series], type=pa_type)
+    strings = pa.array(series, type=pa.string(), from_pandas=True)
+    if pa.types.is_dictionary(pa_type):
+        return strings.cast(pa_type)
+    return strings
+
+
+def frame_to_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Convert a chunk of the text log into an Arrow table with LOG_SCHEMA.
+
+    Columns missing from older logs come out as nulls; columns not in the
+    schema (added by later versions of the app) are kept as plain strings.
+    """
+    arrays, fields = [], []
+    for field in LOG_SCHEMA:
+        if field.name in df.columns:
+            arrays.append(_column_to_array(df[field.name], field.type))
+        else:
+            arrays.append(pa.nulls(len(df), type=field.type))
+        fields.append(field)
+    for name in df.columns:
+        if name not in LOG_SCHEMA.names:
+            arrays.append(pa.array(df[name], type=pa.string(), from_pandas=True))
+            fields.append(pa.field(name, pa.string()))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def iter_log_tables(log_path: str, chunk_rows: int = ROW_GROUP_ROWS, clusters: pd.DataFrame = None):
+    """
+    Yield typed Arrow tables of at most chunk_rows rows from the CSV log.
+
+    ``clusters`` (one row per log row, e.g. from near_duplicates) is joined
+    on row position; rows beyond it get nulls.
+    """
+    reader = pd.read_csv(
+        log_path,
+        dtype=str,
+        keep_default_na=False,
+        na_values=[""],
+        chunksize=chunk_rows,
+    )
+    start = 0
+    for chunk in reader:
+        if clusters is not None:
+            part = clusters.iloc[start:start + len(chunk)].reindex(range(start, start + len(chunk)))
+            chunk = pd.concat([chunk, part.set_axis(chunk.index)], axis=1)
+        start += len(chunk)
+        yield frame_to_table(chunk)
+
+
+def write_log_parquet(
+    log_path: str, sink, chunk_rows: int = ROW_GROUP_ROWS, compression: str = "zstd", clusters: pd.DataFrame = None
+):
+    """Stream the log into a Parquet file, one row group per chunk."""
+    writer = None
+    try:
+        for table in iter_log_tables(log_path, chunk_rows, clusters):
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema, compression=compression)
+            writer.write_table(table, row_group_size=chunk_rows)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, LOG_SCHEMA, compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_log_arrow_ipc(
+    log_path: str, sink, chunk_rows: int = ROW_GROUP_ROWS, compression: str = "zstd", clusters: pd.DataFrame = None
+):
+    """
+    Stream the log into an Arrow IPC stream, one record batch per chunk.
+
+    The streaming format is used (not the random-access file format) because
+    each chunk carries its own category dictionary, which only streams allow.
+    """
+    writer = None
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    try:
+        for table in iter_log_tables(log_path, chunk_rows, clusters):
+            if writer is None:
+                writer = pa.ipc.new_stream(sink, table.schema, options=options)
+            writer.write_table(table, max_chunksize=chunk_rows)
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, LOG_SCHEMA, options=options)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def log_to_parquet_bytes(log_path: str, clusters: pd.DataFrame = None) -> bytes:
+    bio = io.BytesIO()
+    write_log_parquet(log_path, bio, clusters=clusters)
+    return bio.getvalue()
+
+
+def log_to_arrow_ipc_bytes(log_path: str, clusters: pd.DataFrame = None) -> bytes:
+    bio = io.BytesIO()
+    write_log_arrow_ipc(log_path, bio, clusters=clusters)
+    return bio.getvalue()
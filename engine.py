@@ -0,0 +1,216 @@
+"""
+Rule-based interview engine: the keyword / value heuristics behind the
+follow-up questions. The study content (value lexicon, scenarios, follow-up
+bank) comes from the registry; every function takes an optional ``registry``
+snapshot and uses the current one otherwise.
+
+Kept free of Streamlit so the same logic can run in the app and in batch
+tools.
+"""
+import hashlib
+import os
+import random
+import re
+import threading
+from collections import OrderedDict
+
+from registry import Registry, get_registry
+
+# ---------------------------------------------------------
+# CORE LOGIC
+# ---------------------------------------------------------
+STOPWORDS = frozenset(
+    [
+        "the","a","an","and","or","to","of","in","on","for","with",
+        "my","your","our","their","you","i","we","was","were","is",
+        "are","that","this","from","have","has","had","been","at",
+        "as","by","it","itself",
+    ]
+)
+
+def _extract_keywords_uncached(text: str):
+    """Very lightweight keyword extractor (no ML)."""
+    words = re.findall(r"[A-Za-z']+", text.lower())
+    keywords = [w for w in words if w not in STOPWORDS and len(w) > 3]
+    return list(dict.fromkeys(keywords))[:8]
+
+def find_scenario(name_or_value: str, registry: Registry = None):
+    """Scenario for a scenario name or target value, or None."""
+    return (registry or get_registry()).find_scenario(name_or_value)
+
+def _confidence_from_scores(scores: dict):
+    best_value = max(scores, key=scores.get)
+    if scores[best_value] == 0:
+        return "General Professionalism", "Low"
+    elif scores[best_value] <= 2:
+        return best_value, "Medium"
+    else:
+        return best_value, "High"
+
+# ---------------------------------------------------------
+# ANALYSIS CACHE (keywords + value scores, keyed by text hash)
+# ---------------------------------------------------------
+ANALYSIS_CACHE_SIZE = int(os.environ.get("ANALYSIS_CACHE_SIZE", "2048"))
+
+class AnalysisCache:
+    """
+    Thread-safe bounded LRU of text analysis results with hit/miss counters.
+
+    A shared cache also counts ``session_hits``: lookups answered by a
+    per-session cache in front of it, which never reach its ``get``.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.session_hits = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Separate, so counting session hits never waits on a busy LRU.
+        self._session_hits_lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def count_session_hit(self):
+        with self._session_hits_lock:
+            self.session_hits += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "session_hits": self.session_hits,
+            }
+
+_shared_cache = AnalysisCache(ANALYSIS_CACHE_SIZE)
+
+def get_analysis_cache() -> AnalysisCache:
+    """The analysis cache of this process, shared by all sessions / requests."""
+    return _shared_cache
+
+def analyze_text(
+    text: str,
+    session_cache: AnalysisCache = None,
+    registry: Registry = None,
+    shared_cache: AnalysisCache = None,
+) -> dict:
+    """
+    Keywords, value scores and confidence for a text, memoized by content hash.
+
+    Only the hash and the (small) analysis result are kept, never the text itself,
+    so memory stays bounded by the cache sizes regardless of resume length.
+    The registry version is part of the key, so a lexicon change never serves
+    scores computed with the old one. ``shared_cache`` replaces the process-wide
+    cache (one per hosted study, so studies never share results).
+    """
+    registry = registry or get_registry()
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16)
+    digest.update(registry.version.encode("utf-8"))
+    key = digest.hexdigest()
+    shared = shared_cache if shared_cache is not None else get_analysis_cache()
+    if session_cache is not None:
+        result = session_cache.get(key)
+        if result is not None:
+            shared.count_session_hit()
+            return result
+
+    result = shared.get(key)
+    if result is None:
+        scores = registry.score_values(text)
+        value, confidence = _confidence_from_scores(scores)
+        result = {
+            "keywords": tuple(_extract_keywords_uncached(text)),
+            "value_scores": scores,
+            "value": value,
+            "confidence": confidence,
+        }
+        shared.put(key, result)
+
+    if session_cache is not None:
+        session_cache.put(key, result)
+    return result
+
+def extract_keywords(
+    text: str, session_cache: AnalysisCache = None, registry: Registry = None, shared_cache: AnalysisCache = None
+):
+    """Very lightweight keyword extractor (no ML)."""
+    return list(analyze_text(text, session_cache, registry, shared_cache)["keywords"])
+
+def detect_value_tag(
+    answer_text: str, session_cache: AnalysisCache = None, registry: Registry = None, shared_cache: AnalysisCache = None
+):
+    """Heuristic value detector based on word matches."""
+    result = analyze_text(answer_text, session_cache, registry, shared_cache)
+    return result["value"], result["confidence"]
+
+def generate_followup(
+    resume_text: str,
+    answer_text: str,
+    chosen_value: str,
+    session_cache: AnalysisCache = None,
+    rng: random.Random = None,
+    registry: Registry = None,
+    shared_cache: AnalysisCache = None,
+):
+    """
+    Generates a follow-up question + explanation using earlier logic.
+
+    Pass a seeded ``rng`` for reproducible question choice (batch runs);
+    the module-level ``random`` is used otherwise.
+    """
+    registry = registry or get_registry()
+    detected_value, confidence = detect_value_tag(answer_text, session_cache, registry, shared_cache)
+
+    # Respect the scenario target value; report detected as internal guess only
+    value_tag = chosen_value
+    followup = (rng or random).choice(registry.followup_bank[value_tag])
+
+    resume_kws = extract_keywords(resume_text, session_cache, registry, shared_cache)
+    answer_kws = extract_keywords(answer_text, session_cache, registry, shared_cache)
+
+    reasoning = (
+        f"The follow-up targets **{value_tag}** based on the scenario you selected. "
+        f"In your resume, I noticed: {', '.join(resume_kws) or 'no clear keywords'}. "
+        f"In your answer, I noticed: {', '.join(answer_kws) or 'no clear keywords'}. "
+        f"The system's internal guess from your answer alone was **{detected_value}** "
+        f"with **{confidence}** confidence."
+    )
+
+    return followup, reasoning, value_tag, confidence, resume_kws, answer_kws
+
+def neutralize_question(q: str) -> str:
+    """Softens a question if the participant flags it as unfair."""
+    if not q:
+        return ""
+    return "In any context you’re comfortable sharing, " + q[0].lower() + q[1:]
+
+
+def generate_alternative_followup(
+    current_followup: str, value_tag: str, rng: random.Random = None, registry: Registry = None
+) -> str:
+    """Return a different follow-up from the same value bank (simple alternative)."""
+    bank = (registry or get_registry()).followup_bank.get(value_tag, ())
+    if not bank:
+        return ""
+    # Prefer an option different from the current follow-up
+    options = [q for q in bank if q != current_followup] or bank
+    return (rng or random).choice(options)
@@ -0,0 +1,123 @@
+"""
+Local load test for api_server.py (standard library only).
+
+Opens N keep-alive connections and sends requests as fast as the server
+answers, then reports requests/second and latency percentiles.
+
+    python api_server.py --port 8765 &
+    python load_test.py --port 8765 --connections 32 --requests 20000 --endpoint followup
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from registry import get_registry
+
+_WORDS = "team data customer privacy led support ethical initiative users accuracy conflict service".split()
+
+
+def _payload(endpoint: str, rng: random.Random) -> dict:
+    registry = get_registry()
+    scenario = rng.choice(registry.scenarios)
+    text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 120)))
+    if endpoint == "followup":
+        return {"resume": text, "answer": text[::-1], "scenario": scenario["value"]}
+    if endpoint == "value-tag":
+        return {"text": text}
+    if endpoint == "alternative-followup":
+        value = scenario["value"]
+        return {"current_followup": registry.followup_bank[value][0], "value_tag": value}
+    raise ValueError(endpoint)
+
+
+async def _request(reader, writer, host: str, path: str, payload: dict) -> int:
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        (
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        ).encode("latin-1")
+        + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _worker(host, port, endpoints, counter, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] > 0:
+            counter[0] -= 1
+            endpoint = rng.choice(endpoints)
+            t0 = time.perf_counter()
+            status = await _request(reader, writer, host, "/" + endpoint, _payload(endpoint, rng))
+            latencies.append(time.perf_counter() - t0)
+            if status >= 400:
+                errors[0] += 1
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def run(host: str, port: int, connections: int, total: int, endpoints: list, seed: int) -> dict:
+    counter, latencies, errors = [total], [], [0]
+    t0 = time.perf_counter()
+    await asyncio.gather(
+        *(_worker(host, port, endpoints, counter, latencies, errors, seed + i) for i in range(connections))
+    )
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    latency_ms = {f"p{p}": round(percentile(latencies, p) * 1000, 3) for p in (50, 90, 99)}
+    latency_ms["max"] = round(latencies[-1] * 1000, 3) if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "connections": connections,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms": latency_ms,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument(
+        "--endpoint",
+        choices=["followup", "value-tag", "alternative-followup", "mixed"],
+        default="mixed",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    endpoints = (
+        ["followup", "value-tag", "alternative-followup"] if args.endpoint == "mixed" else [args.endpoint]
+    )
+    summary = asyncio.run(run(args.host, args.port, args.connections, args.requests, endpoints, args.seed))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Incremental reader for the CSV session log.
+
+``LogTail`` remembers the byte offset it has parsed up to and, on each
+``refresh``, reads and parses only the bytes appended since. The researcher
+metrics (submission count, unique participant IDs, scenario tallies) are
+updated from those new records alone, so a refresh costs time proportional
+to the new data, not to the size of the log. Reads go in blocks of
+``READ_BLOCK_BYTES``, so even the first scan of a large log has bounded
+memory.
+
+A full rescan from the start happens only when the log was replaced
+(different inode, as with the temp-file rewrite in ``log_row``), truncated
+(smaller than the saved offset) or rewritten with a different header.
+Writers in other processes may be mid-append when we read; a trailing
+partial record is left for the next refresh.
+
+Listeners (e.g. the search index) get every parsed record with its byte
+span in the file, and are reset whenever the reader rescans.
+"""
+import csv
+import io
+import os
+import threading
+from collections import Counter
+
+READ_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+def _record_ends(data: bytes) -> list:
+    """End offsets of the complete records in ``data``.
+
+    A newline ends a record only outside a quoted field, i.e. when the number
+    of quote characters before it is even (escaped quotes come in pairs).
+    """
+    ends = []
+    quotes = 0
+    start = 0
+    while True:
+        nl = data.find(b"\n", start)
+        if nl < 0:
+            return ends
+        quotes += data.count(b'"', start, nl)
+        if quotes % 2 == 0:
+            ends.append(nl + 1)
+        start = nl + 1
+
+
+class LogTail:
+    """Follows one CSV log and keeps running researcher metrics for it."""
+
+    def __init__(self, log_path: str, listeners=()):
+        self.log_path = log_path
+        self.listeners = list(listeners)
+        self.rescans = 0
+        self.last_bytes_read = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self.header = None
+        self._header_bytes = b""
+        self._file_id = None
+        self.total = 0
+        self.participants = set()
+        self.scenario_counts = Counter()
+        for listener in self.listeners:
+            listener.reset()
+
+    def _needs_rescan(self, st: os.stat_result, f) -> bool:
+        if self._file_id is None:
+            return False
+        if (st.st_dev, st.st_ino) != self._file_id or st.st_size < self.offset:
+            return True
+        f.seek(0)
+        return f.read(len(self._header_bytes)) != self._header_bytes
+
+    def refresh(self) -> int:
+        """Parse newly appended records; returns how many were added."""
+        with self._lock:
+            self.last_bytes_read = 0
+            try:
+                f = open(self.log_path, "rb")
+            except FileNotFoundError:
+                if self._file_id is not None:
+                    self._reset()
+                return 0
+            with f:
+                st = os.fstat(f.fileno())
+                if self._needs_rescan(st, f):
+                    self._reset()
+                    self.rescans += 1
+                self._file_id = (st.st_dev, st.st_ino)
+
+                added = 0
+                block = READ_BLOCK_BYTES
+                while self.offset < st.st_size:
+                    f.seek(self.offset)
+                    data = f.read(min(block, st.st_size - self.offset))
+                    self.last_bytes_read += len(data)
+                    ends = _record_ends(data)
+                    if not ends:
+                        if self.offset + len(data) >= st.st_size:
+                            break  # partial record at the end; next refresh
+                        block *= 2  # a single record larger than the block
+                        continue
+                    block = READ_BLOCK_BYTES
+                    base = self.offset
+                    self.offset += ends[-1]
+                    rows = csv.reader(io.StringIO(data[: ends[-1]].decode("utf-8"), newline=""))
+                    spans = zip([0] + ends[:-1], ends)
+                    if self.header is None:
+                        self.header = next(rows, None)
+                        self._header_bytes = data[: ends[0]]
+                        next(spans)
+                    added += self._consume(rows, spans, base)
+                return added
+
+    def _consume(self, rows, spans, base: int) -> int:
+        header = self.header or []
+        pid_col = header.index("participant_id") if "participant_id" in header else None
+        scenario_col = header.index("scenario") if "scenario" in header else None
+        added = 0
+        for row, (start, end) in zip(rows, spans):
+            if not row:
+                continue
+            added += 1
+            for listener in self.listeners:
+                listener.add_record(header, row, base + start, base + end)
+            if pid_col is not None and pid_col < len(row):
+                pid = row[pid_col].strip()
+                if pid:
+                    self.participants.add(pid)
+            if scenario_col is not None and scenario_col < len(row) and row[scenario_col]:
+                self.scenario_counts[row[scenario_col]] += 1
+        self.total += added
+        return added
+
+    def metrics(self) -> dict:
+        """Refresh, then return a snapshot of the running metrics."""
+        self.refresh()
+        with self._lock:
+            return {
+                "total": self.total,
+                "unique_participants": len(self.participants),
+                "scenario_counts": self.scenario_counts.most_common(),
+                "has_participant_column": bool(self.header and "participant_id" in self.header),
+                "has_scenario_column": bool(self.header and "scenario" in self.header),
+                "offset": self.offset,
+                "last_bytes_read": self.last_bytes_read,
+                "rescans": self.rescans,
+            }
@@ -0,0 +1,235 @@
+"""
+Near-duplicate detection for submitted answers and resumes (MinHash + LSH).
+
+Each text gets a MinHash signature at submit time (``signature_columns``,
+stored in the log as ``answer_minhash`` / ``resume_minhash``). Its 64 values
+estimate the Jaccard similarity of the texts' 2-word shingle sets. Each
+value is truncated to 16 bits (b-bit MinHash), so a signature is 172 base64
+characters. ``LshIndex`` splits every signature into 16 bands of 4 values;
+texts sharing any band are candidates, and a candidate pair is a duplicate
+when the signatures agree on at least ``DUPLICATE_THRESHOLD`` of their
+values. Clustering a log is therefore one pass over the signatures, not a
+comparison of every pair.
+
+Cluster ids are the row number (0-based, in log order) of the cluster's
+first session, so they stay stable as the log grows. Sessions without a
+near-duplicate have no cluster id.
+
+    python near_duplicates.py interview_logs.csv
+    python near_duplicates.py interview_logs.csv --out clusters.csv --threshold 0.8
+"""
+import argparse
+import base64
+import json
+import re
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_WORDS = 2
+MIN_WORDS = 5
+DUPLICATE_THRESHOLD = 0.6
+MINHASH_SEED = 617
+
+# Signature column in the log -> text column it is computed from.
+SIGNATURE_FIELDS = {"answer_minhash": "answer_text", "resume_minhash": "resume_text"}
+# Cluster column in exports -> signature column it is computed from.
+CLUSTER_FIELDS = {"answer_duplicate_cluster": "answer_minhash", "resume_duplicate_cluster": "resume_minhash"}
+
+_MERSENNE = (1 << 31) - 1
+_rng = np.random.default_rng(MINHASH_SEED)
+_A = _rng.integers(1, _MERSENNE, NUM_PERM, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, _MERSENNE, NUM_PERM, dtype=np.uint64)[:, None]
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+# ---------------------------------------------------------
+# SIGNATURES
+# ---------------------------------------------------------
+def minhash(text) -> np.ndarray:
+    """uint16[NUM_PERM] MinHash of the text's word shingles, or None for short / empty texts."""
+    tokens = _TOKEN_RE.findall(text.lower()) if isinstance(text, str) else []
+    if len(tokens) < MIN_WORDS:
+        return None
+    shingles = {" ".join(tokens[i:i + SHINGLE_WORDS]) for i in range(len(tokens) - SHINGLE_WORDS + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) & _MERSENNE for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_A * hashes + _B) % _MERSENNE).min(axis=1).astype(np.uint16)
+
+
+def encode_signature(signature) -> str:
+    return "" if signature is None else base64.b64encode(signature.astype("<u2").tobytes()).decode("ascii")
+
+
+def decode_signature(value) -> np.ndarray:
+    if not isinstance(value, str) or not value:
+        return None
+    signature = np.frombuffer(base64.b64decode(value), dtype="<u2")
+    return signature if len(signature) == NUM_PERM else None
+
+
+def signature_columns(row: dict) -> dict:
+    """The MinHash columns of a session row (call on the row as it will be logged)."""
+    return {sig_col: encode_signature(minhash(row.get(text_col, ""))) for sig_col, text_col in SIGNATURE_FIELDS.items()}
+
+
+# ---------------------------------------------------------
+# LSH
+# ---------------------------------------------------------
+class LshIndex:
+    """Banded LSH over MinHash signatures, clustering near-duplicates with union-find."""
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._buckets = [{} for _ in range(BANDS)]
+        self._signatures = []
+        self._parent = []
+        self.comparisons = 0
+
+    def _find(self, i: int) -> int:
+        parent = self._parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def _union(self, i: int, j: int):
+        ri, rj = self._find(i), self._find(j)
+        if ri != rj:
+            # The smaller (earlier) row stays the root, so cluster ids are stable.
+            self._parent[max(ri, rj)] = min(ri, rj)
+
+    def add(self, signature) -> list:
+        """Add the next session's signature (None = no text); returns earlier near-duplicate rows."""
+        doc_id = len(self._parent)
+        self._parent.append(doc_id)
+        self._signatures.append(signature)
+        if signature is None:
+            return []
+        raw = signature.tobytes()
+        width = ROWS_PER_BAND * signature.itemsize
+        checked = set()
+        duplicates = []
+        for band, buckets in enumerate(self._buckets):
+            key = raw[band * width:(band + 1) * width]
+            members = buckets.setdefault(key, [])
+            for other in members:
+                if other in checked:
+                    continue
+                checked.add(other)
+                if self._find(other) == self._find(doc_id):
+                    continue  # already linked through another member
+                self.comparisons += 1
+                if np.count_nonzero(self._signatures[other] == signature) >= self.threshold * NUM_PERM:
+                    duplicates.append(other)
+                    self._union(doc_id, other)
+            members.append(doc_id)
+        return duplicates
+
+    def cluster_ids(self) -> np.ndarray:
+        """Per row: cluster id (first row of the cluster), or -1 without near-duplicates."""
+        roots = np.array([self._find(i) for i in range(len(self._parent))], dtype=np.int64)
+        sizes = np.bincount(roots, minlength=len(roots)) if len(roots) else roots
+        return np.where(sizes[roots] > 1, roots, -1)
+
+
+class DuplicateIndex:
+    """
+    One LshIndex per CLUSTER_FIELDS over the sessions of a log, in log order.
+
+    Used by the batch CLI and, as a LogTail listener, by the app, where each
+    refresh only adds the newly appended sessions.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._indexes = {cluster_col: LshIndex(self.threshold) for cluster_col in CLUSTER_FIELDS}
+            self._header = None
+            self._positions = {}
+
+    def add_session(self, values: dict):
+        """Add one session given its column values (signatures, else texts)."""
+        with self._lock:
+            for cluster_col, sig_col in CLUSTER_FIELDS.items():
+                stored = values.get(sig_col, "")
+                if stored:
+                    signature = decode_signature(stored)
+                else:
+                    signature = minhash(values.get(SIGNATURE_FIELDS[sig_col], ""))
+                self._indexes[cluster_col].add(signature)
+
+    def add_record(self, header: list, row: list, start: int, end: int):
+        if header is not self._header:
+            wanted = set(SIGNATURE_FIELDS) | set(SIGNATURE_FIELDS.values())
+            self._positions = {c: i for i, c in enumerate(header) if c in wanted}
+            self._header = header
+        self.add_session({c: row[i] for c, i in self._positions.items() if i < len(row)})
+
+    def cluster_frame(self, rows: int = None) -> pd.DataFrame:
+        """Cluster ids per session as nullable Int64 columns, padded / cut to ``rows``."""
+        with self._lock:
+            frame = pd.DataFrame({col: index.cluster_ids() for col, index in self._indexes.items()})
+        frame = frame.where(frame >= 0).astype("Int64")
+        if rows is not None:
+            frame = frame.reindex(range(rows))
+        return frame
+
+    def stats(self) -> dict:
+        frame = self.cluster_frame()
+        return {
+            col: {"clusters": int(frame[col].nunique()), "sessions_in_clusters": int(frame[col].notna().sum())}
+            for col in frame.columns
+        }
+
+
+def cluster_log(log_path: str, threshold: float = DUPLICATE_THRESHOLD, chunk_rows: int = 20_000) -> pd.DataFrame:
+    """
+    Duplicate cluster ids for every row of a log, one column per CLUSTER_FIELDS.
+
+    Rows logged before signatures existed get them computed from their text.
+    Missing ids are pandas' nullable Int64 <NA>.
+    """
+    index = DuplicateIndex(threshold)
+    wanted = set(SIGNATURE_FIELDS) | set(SIGNATURE_FIELDS.values())
+    for chunk in pd.read_csv(log_path, usecols=lambda c: c in wanted, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+        for values in chunk.to_dict("records"):
+            index.add_session(values)
+    return index.cluster_frame()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="CSV session log.")
+    parser.add_argument("--out", help="Write per-session cluster ids to this CSV.")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD, help="Minimum estimated Jaccard similarity.")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    clusters = cluster_log(args.log, args.threshold)
+    summary = {"sessions": len(clusters), "seconds": round(time.perf_counter() - t0, 2)}
+    for col in CLUSTER_FIELDS:
+        ids = clusters[col].dropna()
+        sizes = ids.value_counts()
+        summary[col] = {
+            "clusters": int(len(sizes)),
+            "sessions_in_clusters": int(len(ids)),
+            "largest": {int(k): int(v) for k, v in sizes.head(5).items()},
+        }
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    if args.out:
+        clusters.to_csv(args.out, index_label="row")
+
+
+if __name__ == "__main__":
+    main()
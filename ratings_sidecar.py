@@ -0,0 +1,309 @@
+"""
+Fixed-width binary sidecar of the numeric / categorical session results.
+
+``log_row`` appends one 8-byte record per session to ``<log>.ratings`` next
+to the CSV row, so statistics over the ratings never have to parse the free
+text. The file is a 16-byte header followed by records of ``RATING_DTYPE``
+and is memory-mapped straight into a NumPy structured array
+(``load_ratings``). Record i is the session on row i of the log.
+
+Missing or unparseable values are -1 (``MISSING_SCENARIO`` for the scenario).
+Scenario indexes point into ``<log>.scenarios``, the scenario names in the
+order they first appeared in the log, one per line.
+
+Check the sidecar against the log, or rebuild it from the log:
+
+    python ratings_sidecar.py interview_logs.csv
+    python ratings_sidecar.py interview_logs.csv --rebuild
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"RATE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHH8x")
+RATING_DTYPE = np.dtype(
+    [
+        ("fairness", "i1"),
+        ("relevance", "i1"),
+        ("comfort", "i1"),
+        ("trust", "i1"),
+        ("flag_unfair", "i1"),
+        ("accept_ai", "i1"),
+        ("scenario", "<u2"),
+    ]
+)
+MISSING_SCENARIO = 0xFFFF
+ACCEPT_CODES = {"Yes": 0, "No": 1, "Not sure": 2}
+CHUNK_ROWS = 50_000
+
+# Sidecar field -> log column it is encoded from.
+SCORE_FIELDS = {
+    "fairness": "fairness_score",
+    "relevance": "relevance_score",
+    "comfort": "comfort_score",
+    "trust": "trust_score",
+}
+SOURCE_COLUMNS = (*SCORE_FIELDS.values(), "flag_unfair", "accept_ai", "scenario")
+
+_TRUE = {"true", "1", "yes"}
+_FALSE = {"false", "0", "no"}
+
+
+def sidecar_path(log_path: str) -> str:
+    return log_path + ".ratings"
+
+
+def names_path(log_path: str) -> str:
+    return log_path + ".scenarios"
+
+
+# ---------------------------------------------------------
+# ENCODING
+# ---------------------------------------------------------
+def parse_bool(value):
+    """A logged boolean (flag_unfair) as True / False, None if missing or unparseable.
+
+    The one decoding shared by the sidecar and the columnar exports.
+    """
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    return None
+
+
+def encode_frame(frame: pd.DataFrame, names: dict) -> np.ndarray:
+    """
+    Sidecar records for the rows of a log frame (any dtypes).
+
+    ``names`` maps scenario name -> index and is extended in place with
+    names not seen before (in row order).
+    """
+    n = len(frame)
+    records = np.empty(n, dtype=RATING_DTYPE)
+
+    def column(name):
+        return frame[name] if name in frame else pd.Series([None] * n, index=frame.index, dtype=object)
+
+    for field, source in SCORE_FIELDS.items():
+        scores = pd.to_numeric(column(source), errors="coerce")
+        records[field] = scores.where((scores >= 0) & (scores <= 127)).fillna(-1).to_numpy(dtype=np.int8)
+    flags = column("flag_unfair")
+    # Decode each distinct value once; there are only a handful.
+    codes = {value: {True: 1, False: 0}.get(parse_bool(value), -1) for value in flags.dropna().unique()}
+    records["flag_unfair"] = flags.map(codes).fillna(-1).to_numpy(dtype=np.int8)
+    records["accept_ai"] = column("accept_ai").map(ACCEPT_CODES).fillna(-1).to_numpy(dtype=np.int8)
+
+    scenarios = column("scenario")
+    for name in scenarios.dropna().unique():
+        if isinstance(name, str) and name and name not in names:
+            names[name] = len(names)
+    records["scenario"] = scenarios.map(names).fillna(MISSING_SCENARIO).to_numpy(dtype=np.uint16)
+    return records
+
+
+def read_names(log_path: str) -> list:
+    """Scenario names by index."""
+    try:
+        with open(names_path(log_path), encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _header() -> bytes:
+    return HEADER.pack(MAGIC, FORMAT_VERSION, RATING_DTYPE.itemsize)
+
+
+def _write_names(f, names: list):
+    for name in names:
+        f.write(json.dumps(name) + "\n")
+
+
+# ---------------------------------------------------------
+# WRITING (callers hold the log lock)
+# ---------------------------------------------------------
+def append_ratings(frame: pd.DataFrame, log_path: str, new_log: bool = False):
+    """
+    Append the sidecar records of rows just appended to the log.
+
+    For a new log, or without a sidecar (a log from before the sidecar
+    existed), it is built from the whole log instead, which already
+    contains the new rows.
+    """
+    path = sidecar_path(log_path)
+    if new_log or not os.path.exists(path):
+        rebuild_ratings(log_path)
+        return
+    old_names = read_names(log_path)
+    names = {name: i for i, name in enumerate(old_names)}
+    records = encode_frame(frame, names)
+    if len(names) > len(old_names):
+        with open(names_path(log_path), "a", encoding="utf-8") as f:
+            _write_names(f, list(names)[len(old_names):])
+    with open(path, "ab") as f:
+        f.write(records.tobytes())
+
+
+def iter_log_records(log_path: str, chunk_rows: int = CHUNK_ROWS):
+    """(records, names) per chunk of the log; ``names`` is the running name list."""
+    names = {}
+    if not os.path.exists(log_path) or os.path.getsize(log_path) == 0:
+        return
+    chunks = pd.read_csv(
+        log_path,
+        usecols=lambda c: c in SOURCE_COLUMNS,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunk_rows,
+    )
+    for chunk in chunks:
+        yield encode_frame(chunk.where(chunk != ""), names), names
+
+
+def rebuild_ratings(log_path: str, chunk_rows: int = CHUNK_ROWS) -> int:
+    """Rewrite the sidecar (and scenario names) from the log; returns the record count."""
+    tmp_path = sidecar_path(log_path) + ".tmp"
+    rows = 0
+    names = {}
+    with open(tmp_path, "wb") as f:
+        f.write(_header())
+        for records, names in iter_log_records(log_path, chunk_rows):
+            f.write(records.tobytes())
+            rows += len(records)
+    tmp_names = names_path(log_path) + ".tmp"
+    with open(tmp_names, "w", encoding="utf-8") as f:
+        _write_names(f, list(names))
+    # Names first: every index in the new sidecar must resolve.
+    os.replace(tmp_names, names_path(log_path))
+    os.replace(tmp_path, sidecar_path(log_path))
+    return rows
+
+
+# ---------------------------------------------------------
+# READING
+# ---------------------------------------------------------
+def load_ratings(log_path: str) -> np.ndarray:
+    """
+    The sidecar as a read-only structured array (memory-mapped; empty if missing).
+
+    A trailing partial record (a write in progress) is ignored.
+    """
+    path = sidecar_path(log_path)
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return np.empty(0, dtype=RATING_DTYPE)
+    with open(path, "rb") as f:
+        magic, version, itemsize = HEADER.unpack(f.read(HEADER.size).ljust(HEADER.size, b"\0"))
+    if magic != MAGIC or version != FORMAT_VERSION or itemsize != RATING_DTYPE.itemsize:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} ratings sidecar; rebuild it with --rebuild")
+    count = (size - HEADER.size) // RATING_DTYPE.itemsize
+    if count <= 0:
+        return np.empty(0, dtype=RATING_DTYPE)
+    return np.memmap(path, dtype=RATING_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+
+
+def rating_histograms(ratings: np.ndarray, scenarios: int) -> dict:
+    """
+    Field -> int64[scenarios + 1, 256] counts of each byte value per scenario.
+
+    Values are indexed as unsigned bytes (missing -1 -> 255); the last row
+    collects sessions with an unknown or missing scenario. One bincount per
+    field over the raw record bytes, so a million sessions take tens of ms.
+    """
+    raw = np.asarray(ratings).view(np.uint8).reshape(-1, RATING_DTYPE.itemsize)
+    base = np.minimum(ratings["scenario"], scenarios).astype(np.intp) * 256
+    key = np.empty(len(raw), dtype=np.intp)
+    histograms = {}
+    for field in RATING_DTYPE.names:
+        if field == "scenario":
+            continue
+        np.add(base, raw[:, RATING_DTYPE.fields[field][1]], out=key)
+        histograms[field] = np.bincount(key, minlength=(scenarios + 1) * 256).reshape(scenarios + 1, 256)
+    return histograms
+
+
+def summarize_ratings(ratings: np.ndarray, names: list) -> pd.DataFrame:
+    """Per scenario: sessions, mean of each score, share flagged unfair and share accepting the AI."""
+    histograms = rating_histograms(ratings, len(names))
+    columns = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for field in SCORE_FIELDS:
+            counts = histograms[field][:, 1:128]
+            columns[field] = (counts * np.arange(1, 128)).sum(axis=1) / counts.sum(axis=1)
+        flags = histograms["flag_unfair"]
+        columns["flagged_unfair"] = flags[:, 1] / flags[:, :2].sum(axis=1)
+        accept = histograms["accept_ai"]
+        columns["accept_yes"] = accept[:, ACCEPT_CODES["Yes"]] / accept[:, :len(ACCEPT_CODES)].sum(axis=1)
+    sessions = histograms["fairness"].sum(axis=1)
+    frame = pd.DataFrame({"sessions": sessions, **columns}, index=pd.Index([*names, "(none)"], name="scenario"))
+    return frame[frame["sessions"] > 0].round(2)
+
+
+def verify_ratings(log_path: str, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Compare the sidecar with records rebuilt from the log, chunk by chunk."""
+    ratings = load_ratings(log_path)
+    stored_names = read_names(log_path)
+    report = {"log_rows": 0, "sidecar_records": len(ratings), "mismatched": 0, "first_mismatch": None}
+    for records, names in iter_log_records(log_path, chunk_rows):
+        start = report["log_rows"]
+        report["log_rows"] += len(records)
+        stored = ratings[start:start + len(records)]
+        expected = records[:len(stored)]
+        same = np.ones(len(stored), dtype=bool)
+        for field in RATING_DTYPE.names:
+            if field != "scenario":
+                same &= stored[field] == expected[field]
+        # Compare scenarios by name: indexes are only meaningful per name list.
+        to_rebuilt = np.full(MISSING_SCENARIO + 1, -1, dtype=np.int32)
+        to_rebuilt[MISSING_SCENARIO] = MISSING_SCENARIO
+        for i, name in enumerate(stored_names[:MISSING_SCENARIO]):
+            to_rebuilt[i] = names.get(name, -1)
+        same &= to_rebuilt[stored["scenario"]] == expected["scenario"]
+        bad = np.flatnonzero(~same)
+        report["mismatched"] += len(bad)
+        if len(bad) and report["first_mismatch"] is None:
+            report["first_mismatch"] = start + int(bad[0])
+    report["ok"] = report["mismatched"] == 0 and report["log_rows"] == report["sidecar_records"]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="CSV session log.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the sidecar from the log (holds the log lock).")
+    parser.add_argument("--summary", action="store_true", help="Print the per-scenario ratings summary.")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.rebuild:
+        from session_log import log_lock
+
+        with log_lock(args.log):
+            rows = rebuild_ratings(args.log)
+        print(f"rebuilt {rows} records in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+        report = {"ok": True}
+    else:
+        report = verify_ratings(args.log)
+        report["seconds"] = round(time.perf_counter() - t0, 2)
+        print(json.dumps(report, indent=2), file=sys.stderr)
+    if args.summary:
+        print(summarize_ratings(load_ratings(args.log), read_names(args.log)).to_string())
+    if not report["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+PII redaction for free-text session fields before they are logged or exported.
+
+All patterns (emails, URLs, phone numbers, street addresses) are compiled once
+into a single alternation, so each text is scanned in one pass; the name of
+the matching group decides the mask.
+
+Batch mode redacts an existing log in a streaming pass:
+
+    python redaction.py interview_logs.csv -o interview_logs.redacted.csv
+    python redaction.py interview_logs.csv --in-place
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+REDACT_PII = os.environ.get("REDACT_PII", "1") != "0"
+
+# Participant-written (or participant-derived) text columns of a logged row.
+REDACT_FIELDS = (
+    "resume_text",
+    "answer_text",
+    "followup_answer_text",
+    "reasoning_summary",
+    "resume_keywords",
+    "answer_keywords",
+    "unfair_comment",
+    "alternative_answer_text",
+    "open_feedback",
+)
+
+_STREET_SUFFIX = (
+    r"(?i:street|st|avenue|ave|road|rd|boulevard|blvd|lane|ln|drive|dr|court|ct"
+    r"|way|place|pl|terrace|parkway|pkwy|highway|hwy|square|sq)"
+)
+
+_PATTERNS = {
+    "EMAIL": r"[\w.%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}",
+    # Trailing sentence punctuation is not part of a URL.
+    "URL": (
+        r"(?:https?://|www\.)[^\s<>\"')\]]*[^\s<>\"')\].,;:!?]"
+        r"|\b[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.(?:com|org|net|io|edu|gov|dev|me|ai|co)\b"
+        r"(?:/(?:[^\s<>\"')\]]*[^\s<>\"')\].,;:!?])?)?"
+    ),
+    # Phone-shaped numbers only, so counts, years ("2019 2020 2021") and
+    # amounts in a resume survive: +country code with 8-15 digits, (area) code,
+    # 3-3-4 digits, or a 0-prefixed national number.
+    "PHONE": (
+        r"(?:\+(?=(?:[\s.()-]{0,2}\d){8,15}(?![\s.()-]{0,2}\d))\d{1,3}(?:[\s.-]{0,2}\(?\d{1,8}\)?)+"
+        r"|\(\d{2,5}\)[\s.-]?\d{3,4}[\s.-]?\d{3,4}"
+        r"|\d{3}[\s.-]?\d{3}[\s.-]?\d{4}"
+        r"|0\d{2,4}[\s.-]?\d{3,4}[\s.-]?\d{4})"
+        r"(?![\w-]|\.\d)"
+    ),
+    "ADDRESS": (
+        r"\b\d{1,5}\s+(?:[A-Z][A-Za-z]*\.?\s+){1,4}" + _STREET_SUFFIX + r"\b\.?"
+        r"(?:,?\s+(?i:apt|suite|unit)\.?\s*#?\w+|,?\s+#\s*\w+)?"
+    ),
+}
+
+# Every pattern starts at a token boundary, so the shared guard rejects
+# mid-word positions with one lookbehind instead of trying each alternative.
+_SCANNER = re.compile(
+    r"(?<![\w.%+@-])(?=[\w(+])(?:"
+    + "|".join(f"(?P<{name}>{pattern})" for name, pattern in _PATTERNS.items())
+    + ")"
+)
+
+
+# A mask as written by redact_text, e.g. "[EMAIL]".
+MASK_RE = re.compile(r"\[(?:" + "|".join(_PATTERNS) + r")\]")
+
+
+def _mask(match: re.Match) -> str:
+    return f"[{match.lastgroup}]"
+
+
+def redact_text(text):
+    """Mask emails, URLs, phone numbers and street addresses in one scan."""
+    if not isinstance(text, str) or not text:
+        return text
+    return _SCANNER.sub(_mask, text)
+
+
+def strip_pii(text):
+    """
+    Text with PII removed rather than masked, for keyword extraction and value
+    detection: the keywords and reasoning are logged, so they must not be
+    built from contact details, and a mask would itself become a keyword.
+    """
+    if not isinstance(text, str) or not text:
+        return text
+    return MASK_RE.sub(" ", redact_text(text))
+
+
+def redact_row(row: dict, fields=REDACT_FIELDS) -> dict:
+    """Copy of a session row with its free-text fields redacted."""
+    redacted = dict(row)
+    for field in fields:
+        if field in redacted:
+            redacted[field] = redact_text(redacted[field])
+    return redacted
+
+
+def redact_log(src_path: str, dst_path: str, chunk_rows: int = 5_000) -> int:
+    """Stream a CSV log through redaction chunk by chunk; returns rows written."""
+    rows = 0
+    first = True
+    reader = pd.read_csv(src_path, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+    for chunk in reader:
+        for field in REDACT_FIELDS:
+            if field in chunk.columns:
+                chunk[field] = chunk[field].map(redact_text)
+        chunk.to_csv(dst_path, mode="w" if first else "a", header=first, index=False)
+        first = False
+        rows += len(chunk)
+    if first:
+        # Header-only log: keep the header.
+        pd.read_csv(src_path, nrows=0).to_csv(dst_path, index=False)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="CSV session log to redact.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("-o", "--output", help="Write the redacted log here.")
+    target.add_argument("--in-place", action="store_true", help="Replace the log atomically (holds the log lock).")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.in_place:
+        from session_log import log_lock
+
+        tmp_path = args.log + ".redacting"
+        with log_lock(args.log):
+            rows = redact_log(args.log, tmp_path)
+            os.replace(tmp_path, args.log)
+    else:
+        rows = redact_log(args.log, args.output)
+    print(f"redacted {rows} rows in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
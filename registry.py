@@ -0,0 +1,194 @@
+"""
+Study content registry: value lexicon, scenarios and follow-up bank loaded
+from a versioned JSON data file (study_data.json).
+
+A ``Registry`` is an immutable snapshot with its lookup indexes and value
+matchers built once at load time. ``RegistryLoader`` watches the file's
+mtime and, when it changes, validates and builds a new snapshot before
+swapping it in with a single reference assignment. Callers take one snapshot
+per request and keep using it, and recent versions stay available by version
+string, so a session that started on one version is not affected by a
+reload. A version string therefore always names one content: a changed file
+that keeps the current version is rejected (``last_error``) and the loaded
+snapshot stays in service until the version is bumped.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
+STUDY_DATA_FILE = os.environ.get(
+    "STUDY_DATA_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "study_data.json")
+)
+RELOAD_CHECK_INTERVAL = 1.0
+RETAINED_VERSIONS = 8
+
+
+class Registry:
+    """One validated, indexed version of the study content."""
+
+    __slots__ = (
+        "version",
+        "values",
+        "scenarios",
+        "followup_bank",
+        "scenarios_by_name",
+        "scenarios_by_value",
+        "value_matchers",
+    )
+
+    def __init__(self, data: dict):
+        version = data.get("version")
+        values = data.get("values")
+        scenarios = data.get("scenarios")
+        bank = data.get("followup_bank")
+        if not isinstance(version, (str, int)) or str(version) == "":
+            raise ValueError("study data needs a non-empty 'version'")
+        if not isinstance(values, dict) or not values:
+            raise ValueError("study data needs a non-empty 'values' mapping")
+        if not isinstance(scenarios, list) or not scenarios:
+            raise ValueError("study data needs a non-empty 'scenarios' list")
+        if not isinstance(bank, dict):
+            raise ValueError("study data needs a 'followup_bank' mapping")
+
+        by_name, by_value = {}, {}
+        for s in scenarios:
+            if not all(isinstance(s.get(k), str) and s.get(k) for k in ("name", "prompt", "value")):
+                raise ValueError(f"scenario needs 'name', 'prompt' and 'value': {s!r}")
+            if s["value"] not in values:
+                raise ValueError(f"scenario {s['name']!r} targets unknown value {s['value']!r}")
+            if s["name"] in by_name:
+                raise ValueError(f"duplicate scenario name {s['name']!r}")
+            scenario = MappingProxyType(dict(s))
+            by_name[s["name"]] = scenario
+            by_value.setdefault(s["value"], []).append(scenario)
+        for value in values:
+            if not bank.get(value):
+                raise ValueError(f"followup_bank has no questions for value {value!r}")
+
+        self.version = str(version)
+        self.values = MappingProxyType({v: tuple(kws) for v, kws in values.items()})
+        self.scenarios = tuple(by_name.values())
+        self.followup_bank = MappingProxyType({v: tuple(qs) for v, qs in bank.items()})
+        self.scenarios_by_name = MappingProxyType(by_name)
+        self.scenarios_by_value = MappingProxyType({v: tuple(ss) for v, ss in by_value.items()})
+        # Lower-cased keyword tuples per value, in lexicon order, ready for scoring.
+        self.value_matchers = tuple((v, tuple(k.lower() for k in kws)) for v, kws in values.items())
+
+    @classmethod
+    def from_file(cls, path: str) -> "Registry":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def same_content(self, other: "Registry") -> bool:
+        return (
+            self.values == other.values
+            and self.scenarios == other.scenarios
+            and self.followup_bank == other.followup_bank
+        )
+
+    def find_scenario(self, name_or_value: str):
+        """Scenario for a scenario name, else the first one targeting that value, else None."""
+        scenario = self.scenarios_by_name.get(name_or_value)
+        if scenario is None:
+            matches = self.scenarios_by_value.get(name_or_value)
+            scenario = matches[0] if matches else None
+        return scenario
+
+    def score_values(self, text: str) -> dict:
+        """Count value-lexicon word matches in the text."""
+        text = text.lower()
+        return {v: sum(1 for k in kws if k in text) for v, kws in self.value_matchers}
+
+
+class RegistryLoader:
+    """Serves the current Registry for a data file and hot-reloads it on mtime change."""
+
+    def __init__(self, path: str = STUDY_DATA_FILE, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._versions = OrderedDict()
+        self._mtime_ns = os.stat(path).st_mtime_ns
+        self._current = Registry.from_file(path)
+        self._versions[self._current.version] = self._current
+        self._last_check = time.monotonic()
+
+    def current(self) -> Registry:
+        """Latest successfully loaded registry (checks the file at most once per interval)."""
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._maybe_reload(now)
+        return self._current
+
+    def get(self, version: str = None) -> Registry:
+        """A retained registry by version (for sessions pinned to it), else the current one."""
+        if version is not None:
+            registry = self._versions.get(version)
+            if registry is not None:
+                return registry
+        return self.current()
+
+    def _maybe_reload(self, now: float):
+        with self._lock:
+            if now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            try:
+                mtime_ns = os.stat(self.path).st_mtime_ns
+                if mtime_ns == self._mtime_ns:
+                    return
+                registry = Registry.from_file(self.path)
+            except (OSError, ValueError) as exc:
+                # Keep serving the last good version; surface the problem.
+                self.last_error = f"{exc.__class__.__name__}: {exc}"
+                return
+            self._mtime_ns = mtime_ns
+            retained = self._versions.get(registry.version)
+            if retained is not None and not retained.same_content(registry):
+                # Pinned sessions and the analysis caches key on the version.
+                self.last_error = (
+                    f"{self.path} changes the content of version {registry.version} "
+                    "without a version bump; keeping the loaded snapshot"
+                )
+                return
+            self.last_error = None
+            if retained is not None and registry.version == self._current.version:
+                return  # rewritten with the same content
+            self._versions[registry.version] = registry
+            self._versions.move_to_end(registry.version)
+            while len(self._versions) > RETAINED_VERSIONS:
+                self._versions.popitem(last=False)
+            self._current = registry
+            self.reloads += 1
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "version": self._current.version,
+            "retained_versions": list(self._versions),
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+        }
+
+
+_default_loader = None
+_default_loader_lock = threading.Lock()
+
+
+def default_loader() -> RegistryLoader:
+    """Process-wide loader for STUDY_DATA_FILE, created on first use."""
+    global _default_loader
+    if _default_loader is None:
+        with _default_loader_lock:
+            if _default_loader is None:
+                _default_loader = RegistryLoader()
+    return _default_loader
+
+
+def get_registry(version: str = None) -> Registry:
+    return default_loader().get(version)
@@ -0,0 +1,332 @@
+"""
+Replay logged sessions through the current engine and report what changed.
+
+Each session's logged resume and answer are re-run through
+``generate_followup`` and ``detect_value_tag`` with the study content of
+``--data`` (default: the current study_data.json), and the outputs are
+compared with what was logged:
+
+    value_tag, confidence, resume_keywords, answer_keywords,
+    explanation (reasoning_summary), detected_value (the engine's guess),
+    followup_question (still offered for that value?)
+
+Like the app, the replay analyses the texts with PII stripped out. Older
+logs have keywords extracted before PII redaction, so against the log the
+keywords and explanation of a text that contains a redaction mask are not
+compared (such sessions are counted as ``redacted``).
+
+With ``--baseline OLD.json`` the sessions are replayed twice, against the
+old and the new content, and the two replays are compared instead of the
+log. That isolates the effect of a content change from anything else that
+differs from the log (e.g. keywords of texts redacted after analysis).
+Follow-up choice is seeded per log row from ``--seed``, so results do not
+depend on the number of workers.
+
+The log is streamed in chunks through a process pool with a bounded number
+of chunks in flight (``simulate.map_bounded``); workers return per-scenario counts and a few examples,
+never the texts, so memory does not grow with the log. The exit status is 1
+when the share of changed sessions exceeds ``--max-change-rate``.
+
+    python replay.py interview_logs.csv
+    python replay.py interview_logs.csv --data new_study_data.json --max-change-rate 0.05 -o report.json
+    python replay.py interview_logs.csv --baseline study_data.json --data new_study_data.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+import pandas as pd
+
+from engine import ANALYSIS_CACHE_SIZE, AnalysisCache, detect_value_tag, generate_followup
+from redaction import MASK_RE, REDACT_PII, strip_pii
+from registry import STUDY_DATA_FILE, Registry
+from simulate import map_bounded, record_rng
+
+FIELDS = (
+    "value_tag",
+    "confidence",
+    "resume_keywords",
+    "answer_keywords",
+    "explanation",
+    "detected_value",
+    "followup_question",
+)
+READ_COLUMNS = (
+    "scenario",
+    "target_value",
+    "resume_text",
+    "answer_text",
+    "followup_question",
+    "reasoning_summary",
+    "resume_keywords",
+    "answer_keywords",
+    "value_tag",
+    "confidence",
+    "registry_version",
+)
+EXAMPLE_CHARS = 200
+
+# The engine's guess, as embedded in the logged explanation.
+_DETECTED_RE = re.compile(r"internal guess from your answer alone was \*\*(.+?)\*\*")
+
+_registries = {}
+
+
+def load_registry(path: str) -> tuple:
+    """(Registry, AnalysisCache) for a data file, loaded once per process.
+
+    Each data file gets its own analysis cache: two files may carry the same
+    version string, which would otherwise share cached results.
+    """
+    if path not in _registries:
+        _registries[path] = (Registry.from_file(path), AnalysisCache(ANALYSIS_CACHE_SIZE))
+    return _registries[path]
+
+
+def replay_session(record: dict, registry: Registry, cache: AnalysisCache, rng) -> dict:
+    """The compared fields for one logged session, replayed against ``registry``."""
+    scenario = registry.find_scenario(record.get("scenario", "")) or registry.find_scenario(record.get("target_value", ""))
+    if scenario is None:
+        raise ValueError(f"scenario {record.get('scenario')!r} is not in study content version {registry.version}")
+    resume_text = record.get("resume_text", "")
+    answer_text = record.get("answer_text", "")
+    if REDACT_PII:
+        resume_text, answer_text = strip_pii(resume_text), strip_pii(answer_text)
+    followup, reasoning, value_tag, confidence, resume_kws, answer_kws = generate_followup(
+        resume_text, answer_text, scenario["value"], rng=rng, registry=registry, shared_cache=cache
+    )
+    detected_value, _ = detect_value_tag(answer_text, registry=registry, shared_cache=cache)
+    return {
+        "value_tag": value_tag,
+        "confidence": confidence,
+        "resume_keywords": ", ".join(resume_kws),
+        "answer_keywords": ", ".join(answer_kws),
+        "explanation": reasoning,
+        "detected_value": detected_value,
+        "followup_question": followup,
+        "_bank": registry.followup_bank.get(value_tag, ()),
+    }
+
+
+def logged_outputs(record: dict) -> dict:
+    """The compared fields as logged ("" where the log lacks the column)."""
+    detected = _DETECTED_RE.search(record.get("reasoning_summary", ""))
+    return {
+        "value_tag": record.get("value_tag", ""),
+        "confidence": record.get("confidence", ""),
+        "resume_keywords": record.get("resume_keywords", ""),
+        "answer_keywords": record.get("answer_keywords", ""),
+        "explanation": record.get("reasoning_summary", ""),
+        "detected_value": detected.group(1) if detected else "",
+        "followup_question": record.get("followup_question", ""),
+    }
+
+
+def redacted_fields(record: dict) -> set:
+    """Fields whose logged value came from text that was redacted afterwards."""
+    skip = set()
+    if MASK_RE.search(record.get("resume_text", "")):
+        skip.update(("resume_keywords", "explanation"))
+    if MASK_RE.search(record.get("answer_text", "")):
+        skip.update(("answer_keywords", "explanation"))
+    return skip
+
+
+def changed_fields(before: dict, after: dict, against_log: bool, skip=()) -> list:
+    """Fields that differ. Against the log, a follow-up counts as changed only
+    when it is no longer offered for the value (the log's choice was random)."""
+    changed = []
+    for field in FIELDS:
+        old = before.get(field, "")
+        if field in skip or (against_log and not old):
+            continue  # not comparable, or column missing in older logs
+        if field == "followup_question" and against_log:
+            if old not in after["_bank"]:
+                changed.append(field)
+        elif old != after[field]:
+            changed.append(field)
+    return changed
+
+
+def _excerpts(before: str, after: str) -> dict:
+    """Both values, cut to EXAMPLE_CHARS starting shortly before their first difference."""
+    prefix = len(os.path.commonprefix([before, after]))
+    start = max(0, prefix - EXAMPLE_CHARS // 4)
+
+    def clip(value):
+        end = start + EXAMPLE_CHARS
+        return ("…" if start else "") + value[start:end] + ("…" if end < len(value) else "")
+
+    return {"before": clip(before), "after": clip(after)}
+
+
+def _new_stats() -> dict:
+    return {"sessions": 0, "changed": 0, "errors": 0, "redacted": 0, "fields": Counter(), "examples": []}
+
+
+def replay_chunk(data_path: str, baseline_path, seed: int, start: int, records: list, max_examples: int) -> dict:
+    """
+    Worker entry point: replay a chunk of log rows.
+
+    Returns per-scenario counts (sessions, changed, errors, per field) plus
+    up to ``max_examples`` examples per scenario.
+    """
+    registry, cache = load_registry(data_path)
+    baseline = load_registry(baseline_path) if baseline_path else None
+    scenarios = {}
+    for offset, record in enumerate(records):
+        row = start + offset
+        name = record.get("scenario", "") or "(none)"
+        stats = scenarios.get(name)
+        if stats is None:
+            stats = scenarios[name] = _new_stats()
+        stats["sessions"] += 1
+        try:
+            after = replay_session(record, registry, cache, record_rng(seed, row))
+            if baseline is not None:
+                before = replay_session(record, *baseline, record_rng(seed, row))
+            else:
+                before = logged_outputs(record)
+        except Exception as exc:
+            stats["errors"] += 1
+            if len(stats["examples"]) < max_examples:
+                stats["examples"].append({"row": row, "error": str(exc)})
+            continue
+        skip = set() if baseline is not None else redacted_fields(record)
+        stats["redacted"] += bool(skip)
+        changed = changed_fields(before, after, against_log=baseline is None, skip=skip)
+        if not changed:
+            continue
+        stats["changed"] += 1
+        stats["fields"].update(changed)
+        if len(stats["examples"]) < max_examples:
+            stats["examples"].append(
+                {
+                    "row": row,
+                    "fields": {f: _excerpts(before.get(f, ""), after[f]) for f in changed},
+                }
+            )
+    return scenarios
+
+
+def iter_log_chunks(log_path: str, chunk_rows: int):
+    """(first row, [records]) per chunk of the log, reading only the replayed columns."""
+    chunks = pd.read_csv(
+        log_path,
+        usecols=lambda c: c in READ_COLUMNS,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunk_rows,
+    )
+    start = 0
+    for chunk in chunks:
+        yield start, chunk.to_dict("records")
+        start += len(chunk)
+
+
+def merge_chunk(report: dict, scenarios: dict, max_examples: int):
+    for name, stats in scenarios.items():
+        total = report["scenarios"].get(name)
+        if total is None:
+            total = report["scenarios"][name] = _new_stats()
+        for key in ("sessions", "changed", "errors", "redacted"):
+            total[key] += stats[key]
+        total["fields"].update(stats["fields"])
+        total["examples"].extend(stats["examples"][: max_examples - len(total["examples"])])
+
+
+def run(
+    log_path: str,
+    data_path: str,
+    baseline_path=None,
+    seed: int = 0,
+    workers: int = 1,
+    chunk_rows: int = 2000,
+    max_examples: int = 3,
+    progress_every: float = 5.0,
+) -> dict:
+    """Replay the whole log on a process pool (``simulate.map_bounded``) and return the diff report."""
+    t0 = last_report = time.perf_counter()
+    report = {"scenarios": {}}
+    sessions = 0
+    tasks = (
+        (data_path, baseline_path, seed, start, records, max_examples)
+        for start, records in iter_log_chunks(log_path, chunk_rows)
+    )
+    for scenarios in map_bounded(replay_chunk, tasks, workers):
+        merge_chunk(report, scenarios, max_examples)
+        sessions += sum(s["sessions"] for s in scenarios.values())
+        now = time.perf_counter()
+        if progress_every and now - last_report >= progress_every:
+            last_report = now
+            print(f"{sessions} sessions, {sessions / (now - t0):.0f} sessions/s", file=sys.stderr)
+
+    scenarios = report["scenarios"]
+    changed = sum(s["changed"] + s["errors"] for s in scenarios.values())
+    fields = Counter()
+    for stats in scenarios.values():
+        fields.update(stats["fields"])
+        stats["fields"] = dict(stats["fields"].most_common())
+    elapsed = time.perf_counter() - t0
+    return {
+        "log": log_path,
+        "data": data_path,
+        "data_version": load_registry(data_path)[0].version,
+        "baseline": baseline_path,
+        "seed": seed,
+        "sessions": sessions,
+        "changed": changed,
+        "change_rate": round(changed / sessions, 4) if sessions else 0.0,
+        "errors": sum(s["errors"] for s in scenarios.values()),
+        "redacted": sum(s["redacted"] for s in scenarios.values()),
+        "fields": dict(fields.most_common()),
+        "scenarios": dict(sorted(scenarios.items())),
+        "seconds": round(elapsed, 2),
+        "workers": workers,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="CSV session log.")
+    parser.add_argument("--data", default=STUDY_DATA_FILE, help="Study content to replay against (default: current).")
+    parser.add_argument("--baseline", help="Compare against a replay with this study content instead of the log.")
+    parser.add_argument("-o", "--output", default="-", help="Report JSON file (default: stdout).")
+    parser.add_argument("--max-change-rate", type=float, default=0.0, help="Exit 1 above this share of changed sessions.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-rows", type=int, default=2000, help="Log rows per worker task.")
+    parser.add_argument("--examples", type=int, default=3, help="Examples kept per scenario.")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="Seconds between progress lines (0 = off).")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.log,
+        args.data,
+        args.baseline,
+        args.seed,
+        max(1, args.workers),
+        max(1, args.chunk_rows),
+        max(0, args.examples),
+        args.progress_every,
+    )
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(
+        f"{report['changed']} of {report['sessions']} sessions changed ({report['change_rate']:.2%}) "
+        f"in {report['seconds']}s; fields: {report['fields']}",
+        file=sys.stderr,
+    )
+    return 1 if report["change_rate"] > args.max_change_rate else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
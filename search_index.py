@@ -0,0 +1,214 @@
+"""
+Full-text search over the participant-written fields of the session log.
+
+``SearchIndex`` is an inverted index from (field, term) to the ids of the
+sessions containing that term, built incrementally: it is a ``LogTail``
+listener, so each refresh indexes only the records appended since the last
+one, whichever process wrote them. Postings are ``array('i')`` lists in
+session order; at query time each one becomes a boolean mask over all
+sessions, so AND / OR across terms and fields are vectorized NumPy ops.
+
+Adjacent word pairs are indexed as well, so a two-word phrase is answered
+from the postings alone and a longer one only needs to check the few
+sessions that contain all of its word pairs. The texts themselves are not
+kept in memory, only each session's byte span in the log, which is used to
+load hits for display and to verify long phrases.
+
+Query syntax (all parts must match):
+
+    personal                  term, in any searchable field
+    "too personal"            phrase (consecutive terms)
+    unfair:personal           term in one field
+    feedback:"too long"       phrase in one field
+
+Field names: resume, answer, followup, unfair, alternative, feedback.
+"""
+import csv
+import io
+import re
+import threading
+from array import array
+
+import numpy as np
+
+SEARCH_FIELDS = {
+    "resume": "resume_text",
+    "answer": "answer_text",
+    "followup": "followup_answer_text",
+    "unfair": "unfair_comment",
+    "alternative": "alternative_answer_text",
+    "feedback": "open_feedback",
+}
+DISPLAY_COLUMNS = ("timestamp", "participant_id", "scenario")
+SNIPPET_CHARS = 160
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_QUERY_RE = re.compile(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))')
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def parse_query(query: str) -> list:
+    """[(log column or None for any field, [terms])]; one term = term query, more = phrase."""
+    clauses = []
+    for field, phrase, word in _QUERY_RE.findall(query):
+        column = None
+        if field:
+            column = SEARCH_FIELDS.get(field.lower())
+            if column is None:
+                raise ValueError(f"unknown field {field!r} (use one of: {', '.join(SEARCH_FIELDS)})")
+        terms = tokenize(phrase if phrase else word)
+        if terms:
+            clauses.append((column, terms))
+    return clauses
+
+
+def index_keys(tokens: list) -> set:
+    """Terms plus adjacent word pairs ("w1 w2") of a tokenized text."""
+    keys = set(tokens)
+    keys.update(map(" ".join, zip(tokens, tokens[1:])))
+    return keys
+
+
+def _contains_phrase(tokens: list, terms: list) -> bool:
+    n = len(terms)
+    first = terms[0]
+    return any(tokens[i] == first and tokens[i:i + n] == terms for i in range(len(tokens) - n + 1))
+
+
+class SearchIndex:
+    """Inverted index over one log's text fields; fed by a LogTail."""
+
+    def __init__(self, log_path: str, columns=tuple(SEARCH_FIELDS.values())):
+        self.log_path = log_path
+        self.columns = tuple(columns)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._postings = {column: {} for column in self.columns}
+        self._starts = array("q")
+        self._ends = array("q")
+        self._header = None
+
+    # ---------------------------------------------------------
+    # INDEXING (LogTail listener)
+    # ---------------------------------------------------------
+    def add_record(self, header: list, row: list, start: int, end: int):
+        with self._lock:
+            if header is not self._header:
+                self._header = header
+                self._positions = [(c, header.index(c)) for c in self.columns if c in header]
+            doc_id = len(self._starts)
+            self._starts.append(start)
+            self._ends.append(end)
+            for column, pos in self._positions:
+                if pos >= len(row) or not row[pos]:
+                    continue
+                postings = self._postings[column]
+                for key in index_keys(_TOKEN_RE.findall(row[pos].lower())):
+                    ids = postings.get(key)
+                    if ids is None:
+                        postings[key] = ids = array("i")
+                    ids.append(doc_id)
+
+    # ---------------------------------------------------------
+    # QUERIES
+    # ---------------------------------------------------------
+    def _clause_mask(self, column, terms: list) -> np.ndarray:
+        """Boolean mask over session ids: sessions where one field has all the clause's keys."""
+        n = len(self._starts)
+        keys = [" ".join(pair) for pair in zip(terms, terms[1:])] if len(terms) > 1 else terms
+        mask = np.zeros(n, dtype=bool)
+        for c in (column,) if column else self.columns:
+            field_mask = None
+            for key in keys:
+                ids = self._postings[c].get(key)
+                if not ids:
+                    field_mask = None
+                    break
+                key_mask = np.zeros(n, dtype=bool)
+                key_mask[np.frombuffer(ids, dtype=np.int32)] = True
+                field_mask = key_mask if field_mask is None else field_mask & key_mask
+            if field_mask is not None:
+                mask |= field_mask
+        return mask
+
+    def _read_records(self, doc_ids) -> dict:
+        """doc id -> {column: value}, read from the log by byte span."""
+        records = {}
+        with open(self.log_path, "rb") as f:
+            for doc_id in sorted(doc_ids, key=self._starts.__getitem__):
+                f.seek(self._starts[doc_id])
+                raw = f.read(self._ends[doc_id] - self._starts[doc_id]).decode("utf-8")
+                row = next(csv.reader(io.StringIO(raw, newline="")), [])
+                records[doc_id] = dict(zip(self._header, row))
+        return records
+
+    def search(self, query: str, limit: int = 50) -> dict:
+        """
+        Sessions matching every clause, newest first.
+
+        Terms and two-word phrases are answered from the postings alone;
+        longer phrases are narrowed to the sessions containing all their
+        word pairs and then checked against those texts.
+        """
+        clauses = parse_query(query)
+        with self._lock:
+            if not clauses or not self._starts:
+                return {"total": 0, "hits": []}
+            mask = np.ones(len(self._starts), dtype=bool)
+            for column, terms in clauses:
+                mask &= self._clause_mask(column, terms)
+            candidates = np.flatnonzero(mask)
+
+            records = {}
+            long_phrases = [(c, t) for c, t in clauses if len(t) > 2]
+            if long_phrases and len(candidates):
+                records = self._read_records(candidates.tolist())
+                candidates = np.array(
+                    [
+                        doc_id
+                        for doc_id, rec in sorted(records.items())
+                        if all(
+                            any(_contains_phrase(tokenize(rec.get(col, "")), terms) for col in ((column,) if column else self.columns))
+                            for column, terms in long_phrases
+                        )
+                    ],
+                    dtype=np.int32,
+                )
+            top = candidates[::-1][:limit].tolist()
+            missing = [d for d in top if d not in records]
+            if missing:
+                records.update(self._read_records(missing))
+
+        hits = []
+        for doc_id in top:
+            rec = records[doc_id]
+            hit = {col: rec.get(col, "") for col in DISPLAY_COLUMNS}
+            hit["matches"] = self._snippet(rec, clauses)
+            hits.append(hit)
+        return {"total": len(candidates), "hits": hits}
+
+    def _snippet(self, rec: dict, clauses: list) -> str:
+        """Short excerpt around the first query term in the first field that has one."""
+        for column, terms in clauses:
+            for col in (column,) if column else self.columns:
+                text = rec.get(col, "")
+                match = re.search(r"\b" + re.escape(terms[0]), text, re.IGNORECASE)
+                if match:
+                    start = max(0, match.start() - SNIPPET_CHARS // 4)
+                    excerpt = text[start:start + SNIPPET_CHARS].replace("\n", " ")
+                    label = next(k for k, v in SEARCH_FIELDS.items() if v == col)
+                    return f"{label}: {'…' if start else ''}{excerpt}{'…' if start + SNIPPET_CHARS < len(text) else ''}"
+        return ""
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._starts),
+                "terms": sum(len(p) for p in self._postings.values()),
+                "postings": sum(len(ids) for p in self._postings.values() for ids in p.values()),
+            }
@@ -0,0 +1,102 @@
+"""
+The CSV session log shared by the Streamlit app and the JSON API.
+
+Writers in different threads and processes serialize on a sidecar lock file,
+so the app and the API can append to the same log concurrently.
+"""
+import csv
+import os
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from ratings_sidecar import append_ratings
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+LOG_FILE = "interview_logs.csv"
+
+# Column order of a logged session (the keys of the row built on submit).
+LOG_COLUMNS = [
+    "timestamp",
+    "participant_id",
+    "scenario",
+    "scenario_prompt_used",
+    "target_value",
+    "resume_text",
+    "answer_text",
+    "followup_answer_text",
+    "followup_question",
+    "reasoning_summary",
+    "resume_keywords",
+    "answer_keywords",
+    "value_tag",
+    "confidence",
+    "fairness_score",
+    "relevance_score",
+    "comfort_score",
+    "trust_score",
+    "flag_unfair",
+    "unfair_comment",
+    "alternative_question",
+    "alternative_answer_text",
+    "neutralized_question",
+    "accept_ai",
+    "open_feedback",
+    "registry_version",
+    "answer_minhash",
+    "resume_minhash",
+]
+
+_thread_lock = threading.Lock()
+
+
+@contextmanager
+def log_lock(log_path: str = LOG_FILE):
+    """Exclusive lock for writing the log, across threads and processes."""
+    with _thread_lock:
+        with open(log_path + ".lock", "a") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def read_header(log_path: str = LOG_FILE):
+    """Column names of an existing log, or None if there is no log yet."""
+    if not os.path.exists(log_path) or os.path.getsize(log_path) == 0:
+        return None
+    with open(log_path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), None)
+
+
+def log_row(row: dict, log_path: str = LOG_FILE):
+    """
+    Append one session to the log.
+
+    When the row has the same columns as the existing log it is appended in
+    place; only a column change (new app version) rewrites the file, which is
+    done via a temp file so readers never see a half-written log. The row's
+    ratings also go to the binary sidecar (see ratings_sidecar.py).
+    """
+    df_row = pd.DataFrame([row])
+    with log_lock(log_path):
+        header = read_header(log_path)
+        if header is None:
+            df_row.to_csv(log_path, index=False)
+        elif header == list(df_row.columns):
+            df_row.to_csv(log_path, mode="a", header=False, index=False)
+        else:
+            df_existing = pd.read_csv(log_path)
+            df_all = pd.concat([df_existing, df_row], ignore_index=True)
+            tmp_path = log_path + ".tmp"
+            df_all.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, log_path)
+        append_ratings(df_row, log_path, new_log=header is None)
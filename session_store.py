@@ -0,0 +1,275 @@
+"""
+Compact per-participant session records and a process-wide store that spills
+idle sessions to local disk.
+
+Each participant's progress lives in one ``SessionRecord`` (``__slots__``, no
+per-instance dict) keyed by a random session token. ``SessionStore.sweep``
+moves records that have been idle longer than the timeout to
+``<spill_dir>/<token>.json`` and drops them from memory; ``get`` transparently
+restores them when the participant comes back. Spilled records that are
+not picked up within ``SESSION_SPILL_TTL`` seconds are deleted, since they
+hold raw participant texts. With a ``CheckpointStore`` attached, records
+saved at step boundaries also survive a server restart.
+"""
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", "900"))
+SESSION_SPILL_DIR = os.environ.get("SESSION_SPILL_DIR", "session_spill")
+SESSION_SPILL_TTL = float(os.environ.get("SESSION_SPILL_TTL", "86400"))
+SWEEP_INTERVAL = 30.0
+
+_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def is_valid_token(token) -> bool:
+    return isinstance(token, str) and bool(_TOKEN_RE.match(token))
+
+
+class SessionRecord:
+    """All state of one participant session (4 steps after consent)."""
+
+    __slots__ = (
+        "token",
+        "study_id",
+        "last_seen",
+        "consent",
+        "participant_id",
+        # progress flags
+        "resume_done",
+        "scenario_answer_done",
+        "followup_generated",
+        "followup_response_done",
+        "followup_done",
+        # step control
+        "active_step",
+        "exp1_open",
+        "exp2_open",
+        "exp3_open",
+        "exp4_open",
+        # scenario state
+        "scenario_name",
+        "scenario_prompt",
+        "prev_scenario_name",
+        "registry_version",
+        # participant texts
+        "resume_text",
+        "answer_text",
+        "followup_answer_text",
+        "unfair_details",
+        "alternative_question",
+        "alternative_answer_text",
+        # generated follow-up
+        "followup",
+        "reasoning",
+        "value_tag",
+        "confidence",
+        "resume_kws",
+        "answer_kws",
+    )
+
+    def __init__(self, token: str, scenario_name: str = ""):
+        self.token: str = token
+        self.study_id: str = ""
+        self.last_seen: float = time.time()
+        self.consent: bool = False
+        self.participant_id: str = ""
+
+        self.resume_done: bool = False
+        self.scenario_answer_done: bool = False
+        self.followup_generated: bool = False
+        self.followup_response_done: bool = False
+        self.followup_done: bool = False
+
+        self.active_step: int = 1  # 1–4 after consent
+        self.exp1_open: bool = True
+        self.exp2_open: bool = False
+        self.exp3_open: bool = False
+        self.exp4_open: bool = False
+
+        self.scenario_name: str = scenario_name
+        self.scenario_prompt: str = ""
+        self.prev_scenario_name: str = None
+        self.registry_version: str = None  # study content version pinned at start
+
+        self.resume_text: str = ""
+        self.answer_text: str = ""
+        self.followup_answer_text: str = ""
+        self.unfair_details: str = ""
+        self.alternative_question: str = ""
+        self.alternative_answer_text: str = ""
+
+        self.followup: str = ""
+        self.reasoning: str = ""
+        self.value_tag: str = ""
+        self.confidence: str = ""
+        self.resume_kws: list = []
+        self.answer_kws: list = []
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SessionRecord":
+        record = cls(data["token"])
+        for name in cls.__slots__:
+            if name in data:
+                setattr(record, name, data[name])
+        return record
+
+    def footprint_bytes(self) -> int:
+        """Approximate memory held by this record (object + slot values)."""
+        total = sys.getsizeof(self)
+        for name in self.__slots__:
+            value = getattr(self, name)
+            total += sys.getsizeof(value)
+            if isinstance(value, list):
+                total += sum(sys.getsizeof(v) for v in value)
+        return total
+
+
+class SessionStore:
+    """Thread-safe token -> SessionRecord map with idle spill-to-disk."""
+
+    def __init__(
+        self,
+        spill_dir: str = SESSION_SPILL_DIR,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT,
+        checkpoints=None,
+        spill_ttl: float = SESSION_SPILL_TTL,
+    ):
+        self.spill_dir = spill_dir
+        self.idle_timeout = idle_timeout
+        self.checkpoints = checkpoints
+        self.spill_ttl = spill_ttl
+        self.evicted = 0
+        self.restored = 0
+        self.expired = 0
+        self._records = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _spill_path(self, token: str) -> str:
+        return os.path.join(self.spill_dir, f"{token}.json")
+
+    def get(self, token: str):
+        """
+        In-memory record, else the spilled one, else the last checkpoint
+        (restored into memory), else None.
+        """
+        with self._lock:
+            record = self._records.get(token)
+            if record is None and is_valid_token(token):
+                path = self._spill_path(token)
+                if os.path.exists(path):
+                    with open(path, encoding="utf-8") as f:
+                        record = SessionRecord.from_dict(json.load(f))
+                    os.remove(path)
+                elif self.checkpoints is not None:
+                    state = self.checkpoints.load(token)
+                    if state is not None:
+                        record = SessionRecord.from_dict({**state, "token": token})
+                if record is not None:
+                    self._records[token] = record
+                    self.restored += 1
+            if record is not None:
+                record.last_seen = time.time()
+            return record
+
+    def is_resident(self, token: str) -> bool:
+        """Whether the record is in memory (not spilled), without touching it."""
+        with self._lock:
+            return token in self._records
+
+    def create(self, scenario_name: str = "", token: str = None) -> SessionRecord:
+        record = SessionRecord(token if is_valid_token(token) else new_token(), scenario_name)
+        with self._lock:
+            self._records[record.token] = record
+        return record
+
+    def discard(self, token: str):
+        """Forget a session entirely (reset), including any spilled copy and checkpoints."""
+        with self._lock:
+            self._records.pop(token, None)
+            if is_valid_token(token) and os.path.exists(self._spill_path(token)):
+                os.remove(self._spill_path(token))
+        if self.checkpoints is not None:
+            self.checkpoints.delete(token)
+
+    def checkpoint(self, record: SessionRecord) -> int:
+        """Durably save the record's changed fields (call at step boundaries)."""
+        if self.checkpoints is None:
+            return 0
+        return self.checkpoints.save(record.token, record.to_dict())
+
+    def complete(self, token: str):
+        """The session reached the log; its checkpoints are no longer needed."""
+        if self.checkpoints is not None:
+            self.checkpoints.delete(token)
+
+    def sweep(self, force: bool = False) -> int:
+        """
+        Spill records idle longer than the timeout, delete spilled ones older
+        than the spill TTL and expire abandoned checkpoints; rate-limited
+        unless forced.
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < SWEEP_INTERVAL:
+                return 0
+            self._last_sweep = now
+            idle = [r for r in self._records.values() if now - r.last_seen > self.idle_timeout]
+            if idle:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            for record in idle:
+                path = self._spill_path(record.token)
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(record.to_dict(), f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+                del self._records[record.token]
+            self.evicted += len(idle)
+            self._expire_spilled(now)
+        if self.checkpoints is not None:
+            self.checkpoints.expire()
+        return len(idle)
+
+    def _expire_spilled(self, now: float):
+        try:
+            names = os.listdir(self.spill_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.spill_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.spill_ttl:
+                    os.remove(path)
+                    self.expired += name.endswith(".json")
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            footprints = [r.footprint_bytes() for r in self._records.values()]
+        spilled = 0
+        if os.path.isdir(self.spill_dir):
+            spilled = sum(1 for n in os.listdir(self.spill_dir) if n.endswith(".json"))
+        return {
+            "in_memory": len(footprints),
+            "spilled": spilled,
+            "bytes_in_memory": sum(footprints),
+            "mean_bytes_per_session": int(sum(footprints) / len(footprints)) if footprints else 0,
+            "max_bytes_per_session": max(footprints, default=0),
+            "evicted": self.evicted,
+            "restored": self.restored,
+            "expired": self.expired,
+        }
@@ -0,0 +1,146 @@
+"""
+TF-IDF similarity between each session's answer, scenario prompt and
+follow-up question, as an objective relevance proxy next to the subjective
+``relevance_score``.
+
+All three texts of every session go into one sparse TF-IDF matrix (shared
+vocabulary and IDF over the whole log). Rows are L2-normalized, so the
+cosine similarity of a session's pair of texts is the row-wise dot product
+of two slices of that matrix, computed for all sessions at once.
+
+    python similarity.py interview_logs.csv
+    python similarity.py interview_logs.csv --out similarities.csv
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from array import array
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from engine import STOPWORDS
+
+TEXT_FIELDS = ("answer_text", "scenario_prompt_used", "followup_question")
+RATING_FIELDS = ("fairness_score", "relevance_score", "comfort_score", "trust_score")
+SIMILARITY_PAIRS = {
+    "sim_answer_prompt": ("answer_text", "scenario_prompt_used"),
+    "sim_answer_followup": ("answer_text", "followup_question"),
+    "sim_prompt_followup": ("scenario_prompt_used", "followup_question"),
+}
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+
+class _CsrBuilder:
+    """Accumulates term counts row by row into CSR arrays (no dense rows)."""
+
+    def __init__(self, vocab: dict):
+        self.vocab = vocab
+        self.indptr = array("q", [0])
+        self.indices = array("i")
+        self.data = array("f")
+
+    def add(self, text) -> None:
+        tokens = _TOKEN_RE.findall(text.lower()) if isinstance(text, str) else ()
+        counts = Counter(t for t in tokens if len(t) > 2 and t not in STOPWORDS)
+        for term, count in counts.items():
+            self.indices.append(self.vocab.setdefault(term, len(self.vocab)))
+            self.data.append(count)
+        self.indptr.append(len(self.indices))
+
+    def to_csr(self, n_terms: int) -> sp.csr_matrix:
+        n_rows = len(self.indptr) - 1
+        return sp.csr_matrix(
+            (
+                np.frombuffer(self.data, dtype=np.float32),
+                np.frombuffer(self.indices, dtype=np.int32),
+                np.frombuffer(self.indptr, dtype=np.int64),
+            ),
+            shape=(n_rows, n_terms),
+        )
+
+
+def tfidf(counts: sp.csr_matrix) -> sp.csr_matrix:
+    """Sublinear TF x smoothed IDF, rows L2-normalized (empty rows stay zero)."""
+    n_docs = counts.shape[0]
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+    weighted = counts.copy()
+    weighted.data = (1 + np.log(weighted.data)) * idf[weighted.indices]
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sp.diags((1 / norms).astype(np.float32)).dot(weighted).tocsr()
+
+
+def session_similarities(log_path: str, chunk_rows: int = 20_000):
+    """
+    Per-session cosine similarities plus scenario and ratings.
+
+    The log is read in chunks and only the three text fields are tokenized,
+    straight into CSR arrays, so memory grows with the number of non-zero
+    terms rather than sessions x vocabulary.
+    """
+    vocab = {}
+    builders = {field: _CsrBuilder(vocab) for field in TEXT_FIELDS}
+    meta = []
+    wanted = set(TEXT_FIELDS) | set(RATING_FIELDS) | {"scenario", "flag_unfair"}
+    for chunk in pd.read_csv(log_path, usecols=lambda c: c in wanted, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+        for field in TEXT_FIELDS:
+            column = chunk[field] if field in chunk.columns else [""] * len(chunk)
+            for text in column:
+                builders[field].add(text)
+        meta.append(chunk.drop(columns=[c for c in TEXT_FIELDS if c in chunk.columns]))
+
+    n = len(builders[TEXT_FIELDS[0]].indptr) - 1
+    matrix = tfidf(sp.vstack([builders[f].to_csr(len(vocab)) for f in TEXT_FIELDS], format="csr"))
+    blocks = {f: matrix[i * n:(i + 1) * n] for i, f in enumerate(TEXT_FIELDS)}
+
+    result = pd.concat(meta, ignore_index=True) if meta else pd.DataFrame()
+    for col in RATING_FIELDS:
+        if col in result.columns:
+            result[col] = pd.to_numeric(result[col], errors="coerce")
+    for name, (a, b) in SIMILARITY_PAIRS.items():
+        result[name] = np.asarray(blocks[a].multiply(blocks[b]).sum(axis=1)).ravel()
+    return result, {"sessions": n, "vocabulary": len(vocab), "nnz": int(matrix.nnz)}
+
+
+def rating_correlations(df: pd.DataFrame, method: str = "spearman") -> pd.DataFrame:
+    """Correlation of each similarity with each logged rating, overall and per scenario."""
+    ratings = [c for c in RATING_FIELDS if c in df.columns]
+    groups = [("(all)", df)]
+    if "scenario" in df.columns:
+        groups += list(df.groupby("scenario", sort=True))
+    rows = []
+    for scenario, part in groups:
+        corr = part[list(SIMILARITY_PAIRS) + ratings].corr(method=method)
+        for sim in SIMILARITY_PAIRS:
+            row = {"scenario": scenario, "similarity": sim, "n": len(part)}
+            row.update({rating: corr.at[sim, rating] for rating in ratings})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="CSV session log.")
+    parser.add_argument("--out", help="Write per-session similarities to this CSV.")
+    parser.add_argument("--method", choices=["spearman", "pearson"], default="spearman")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    sims, info = session_similarities(args.log)
+    info["seconds"] = round(time.perf_counter() - t0, 2)
+    print(json.dumps(info), file=sys.stderr)
+    if args.out:
+        sims.to_csv(args.out, index_label="row")
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(rating_correlations(sims, args.method).round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Batch simulation: run synthetic participants through the interview engine
+without Streamlit.
+
+Input is JSONL, one participant per line:
+
+    {"id": "p1", "resume": "...", "scenario": "Collaboration", "answer": "..."}
+
+``scenario`` may be a scenario name or its target value. Output is JSONL in
+input order with the follow-up, explanation fields, the neutralized question
+and an alternative follow-up. Question choice is seeded per record from
+``--seed`` and the record's index (its position among the non-blank input
+lines, also the ``index`` in the output), so output does not depend on the
+number of workers, the chunk size or blank lines in the input.
+
+    python simulate.py cohort.jsonl -o results.jsonl --seed 7 --workers 8
+    cat cohort.jsonl | python simulate.py - > results.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import (
+    detect_value_tag,
+    find_scenario,
+    generate_alternative_followup,
+    generate_followup,
+    neutralize_question,
+)
+from registry import get_registry
+
+def record_rng(seed: int, index: int) -> random.Random:
+    """Independent, reproducible RNG for the record at a given index (non-blank lines only)."""
+    return random.Random(f"{seed}:{index}")
+
+
+def simulate_record(record: dict, rng: random.Random) -> dict:
+    """Run one participant through the same steps the UI does."""
+    registry = get_registry()
+    scenario = find_scenario(record.get("scenario", ""), registry)
+    if scenario is None:
+        raise ValueError(f"unknown scenario: {record.get('scenario')!r}")
+    resume_text = record.get("resume", "") or ""
+    answer_text = record.get("answer", "") or ""
+
+    followup, reasoning, value_tag, confidence, resume_kws, answer_kws = generate_followup(
+        resume_text, answer_text, scenario["value"], rng=rng, registry=registry
+    )
+    detected_value, _ = detect_value_tag(answer_text, registry=registry)
+    return {
+        "scenario": scenario["name"],
+        "target_value": scenario["value"],
+        "followup_question": followup,
+        "reasoning_summary": reasoning,
+        "value_tag": value_tag,
+        "detected_value": detected_value,
+        "confidence": confidence,
+        "resume_keywords": resume_kws,
+        "answer_keywords": answer_kws,
+        "neutralized_question": neutralize_question(followup),
+        "alternative_question": generate_alternative_followup(followup, value_tag, rng=rng, registry=registry),
+        "registry_version": registry.version,
+    }
+
+
+def simulate_chunk(seed: int, start: int, lines: list) -> tuple:
+    """
+    Worker entry point: simulate a chunk of raw JSONL lines.
+
+    Returns the serialized output lines plus the number of failed records.
+    """
+    out, errors = [], 0
+    for offset, line in enumerate(lines):
+        index = start + offset
+        try:
+            record = json.loads(line)
+            result = simulate_record(record, record_rng(seed, index))
+            result = {"index": index, "id": record.get("id", index), **result}
+        except Exception as exc:
+            errors += 1
+            result = {"index": index, "error": str(exc)}
+        out.append(json.dumps(result, ensure_ascii=False))
+    return out, errors
+
+
+def iter_chunks(lines, chunk_size: int):
+    """Group non-blank input lines into (start_index, [lines]) chunks."""
+    chunk, start, index = [], 0, 0
+    for line in lines:
+        if not line.strip():
+            continue
+        if not chunk:
+            start = index
+        chunk.append(line)
+        index += 1
+        if len(chunk) >= chunk_size:
+            yield start, chunk
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+def map_bounded(fn, tasks, workers: int):
+    """
+    Yield ``fn(*task)`` for each task from a process pool, in task order.
+
+    At most ``2 * workers`` tasks are in flight, so memory stays bounded no
+    matter how long the input is.
+    """
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for task in tasks:
+            pending.append(pool.submit(fn, *task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run(lines, out, seed: int, workers: int, chunk_size: int, progress_every: float = 5.0) -> dict:
+    """Stream chunks through a process pool (``map_bounded``) and write results in input order."""
+    t0 = last_report = time.perf_counter()
+    records = errors = 0
+    tasks = ((seed, start, chunk) for start, chunk in iter_chunks(lines, chunk_size))
+    for out_lines, chunk_errors in map_bounded(simulate_chunk, tasks, workers):
+        out.write("\n".join(out_lines) + "\n")
+        records += len(out_lines)
+        errors += chunk_errors
+        now = time.perf_counter()
+        if progress_every and now - last_report >= progress_every:
+            last_report = now
+            print(f"{records} records, {records / (now - t0):.0f} rec/s", file=sys.stderr)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "records": records,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "records_per_second": round(records / elapsed, 1) if elapsed else None,
+        "workers": workers,
+        "chunk_size": chunk_size,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Participants JSONL file, or - for stdin.")
+    parser.add_argument("-o", "--output", default="-", help="Output JSONL file (default: stdout).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records per worker task.")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="Seconds between progress lines (0 = off).")
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = run(src, dst, args.seed, max(1, args.workers), max(1, args.chunk_size), args.progress_every)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Several studies (cohorts / variants) hosted by one server process.
+
+A study is selected with the ``?study=<id>`` URL parameter and has its own
+study content file, session log and admin password. The studies are listed
+in a JSON config (``STUDIES_FILE``, default ``studies.json``):
+
+    {
+      "pilot": {"data": "study_data.json", "log": "interview_logs.csv",
+                "admin_password_env": "ADMIN_PASSWORD"},
+      "cohort-b": {"data": "studies/cohort_b.json", "log": "logs/cohort_b.csv",
+                   "admin_password_env": "ADMIN_PASSWORD_COHORT_B"}
+    }
+
+Relative paths are resolved against the config file's directory. Passwords
+are never stored in the config; each study names the environment variable
+that holds its password; a study without ``admin_password_env`` has no
+researcher view. The first entry is the default study. Without a
+config file there is a single study, ``default``, configured exactly like
+before (STUDY_DATA_FILE, the standard log file and ADMIN_PASSWORD).
+
+``StudyHost`` opens a study on first use and shares its registry loader
+(validated scenarios, indexes and value matchers), analysis cache, log
+metrics, search index and near-duplicate index with every session of that
+study. Studies that have not been used for
+``STUDY_IDLE_TIMEOUT`` seconds are closed, and their resources go with them.
+They are reopened from the config when they are next requested.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+from engine import ANALYSIS_CACHE_SIZE, AnalysisCache
+from log_tail import LogTail
+from near_duplicates import DuplicateIndex
+from search_index import SearchIndex
+from registry import STUDY_DATA_FILE, RegistryLoader
+from session_log import LOG_FILE
+
+STUDIES_FILE = os.environ.get("STUDIES_FILE", "studies.json")
+STUDY_IDLE_TIMEOUT = float(os.environ.get("STUDY_IDLE_TIMEOUT", "1800"))
+DEFAULT_STUDY_ID = "default"
+SWEEP_INTERVAL = 60.0
+
+_STUDY_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class UnknownStudy(KeyError):
+    """The requested study id is not in the config."""
+
+
+def load_study_configs(path: str = STUDIES_FILE) -> dict:
+    """Study id -> {"data", "log", "admin_password_env"}, in config order."""
+    if not os.path.exists(path):
+        return {
+            DEFAULT_STUDY_ID: {
+                "data": STUDY_DATA_FILE,
+                "log": LOG_FILE,
+                "admin_password_env": "ADMIN_PASSWORD",
+            }
+        }
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    if not isinstance(raw, dict) or not raw:
+        raise ValueError(f"{path}: expected a non-empty object of study id -> settings")
+
+    base = os.path.dirname(os.path.abspath(path))
+    configs = {}
+    for study_id, settings in raw.items():
+        if not _STUDY_ID_RE.match(study_id):
+            raise ValueError(f"{path}: invalid study id {study_id!r}")
+        if not isinstance(settings, dict) or not all(
+            isinstance(settings.get(k), str) and settings.get(k) for k in ("data", "log")
+        ):
+            raise ValueError(f"{path}: study {study_id!r} needs 'data' and 'log' paths")
+        configs[study_id] = {
+            "data": os.path.join(base, settings["data"]),
+            "log": os.path.join(base, settings["log"]),
+            "admin_password_env": settings.get("admin_password_env", ""),
+        }
+    return configs
+
+
+class Study:
+    """Resources shared by all sessions of one study."""
+
+    __slots__ = (
+        "study_id",
+        "log_path",
+        "admin_password_env",
+        "loader",
+        "analysis_cache",
+        "log_tail",
+        "search_index",
+        "duplicate_index",
+        "opened_at",
+        "last_used",
+    )
+
+    def __init__(self, study_id: str, config: dict, cache_size: int = ANALYSIS_CACHE_SIZE):
+        self.study_id = study_id
+        self.log_path = config["log"]
+        self.admin_password_env = config["admin_password_env"]
+        self.loader = RegistryLoader(config["data"])
+        self.analysis_cache = AnalysisCache(cache_size)
+        self.search_index = SearchIndex(self.log_path)
+        self.duplicate_index = DuplicateIndex()
+        self.log_tail = LogTail(self.log_path, listeners=[self.search_index, self.duplicate_index])
+        self.opened_at = self.last_used = time.time()
+
+    @property
+    def admin_password(self) -> str:
+        """Read on every access, so a rotated password takes effect immediately."""
+        return os.environ.get(self.admin_password_env, "") if self.admin_password_env else ""
+
+
+class StudyHost:
+    """Thread-safe study id -> open Study map with idle eviction."""
+
+    def __init__(self, configs: dict, idle_timeout: float = STUDY_IDLE_TIMEOUT):
+        self.configs = configs
+        self.idle_timeout = idle_timeout
+        self.opened = 0
+        self.evicted = 0
+        self._studies = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    @property
+    def default_study_id(self) -> str:
+        return next(iter(self.configs))
+
+    def get(self, study_id: str = None) -> Study:
+        """The open study, opening it on first use; raises UnknownStudy."""
+        study_id = study_id or self.default_study_id
+        config = self.configs.get(study_id)
+        if config is None:
+            raise UnknownStudy(study_id)
+        with self._lock:
+            study = self._studies.get(study_id)
+            if study is None:
+                study = Study(study_id, config)
+                self._studies[study_id] = study
+                self.opened += 1
+            study.last_used = time.time()
+            return study
+
+    def sweep(self, force: bool = False) -> int:
+        """Close studies idle longer than the timeout; rate-limited unless forced."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < SWEEP_INTERVAL:
+                return 0
+            self._last_sweep = now
+            idle = [sid for sid, s in self._studies.items() if now - s.last_used > self.idle_timeout]
+            for study_id in idle:
+                del self._studies[study_id]
+            self.evicted += len(idle)
+            return len(idle)
+
+    def stats(self) -> dict:
+        with self._lock:
+            studies = list(self._studies.values())
+        return {
+            "configured": len(self.configs),
+            "open": {
+                s.study_id: {
+                    "registry_version": s.loader.current().version,
+                    "analysis_cache_size": s.analysis_cache.stats()["size"],
+                    "idle_seconds": round(time.time() - s.last_used, 1),
+                }
+                for s in studies
+            },
+            "opened": self.opened,
+            "evicted": self.evicted,
+        }